@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'HNG2.settings')
+# Route the hot endpoints to native async views rather than thread-hopping sync ones
+os.environ.setdefault('ANALYZER_ASYNC_VIEWS', 'true')
 
 application = get_asgi_application()
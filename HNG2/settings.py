@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so its latency covers the whole middleware stack
+    'analyzer.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,6 +83,12 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # WAL lets every gunicorn worker read while one writes
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL',
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -124,3 +133,54 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# String analyzer engine
+# Strings of at least this many characters are analyzed on a process pool
+ANALYZER_PARALLEL_THRESHOLD = int(os.environ.get('ANALYZER_PARALLEL_THRESHOLD', 1024 * 1024))
+# Worker processes for the pool (defaults to the number of CPUs)
+ANALYZER_MAX_WORKERS = int(os.environ.get('ANALYZER_MAX_WORKERS', 0)) or None
+# Async views analyze strings of at least this many characters on a thread
+# so the event loop keeps serving other connections
+ANALYZER_ASYNC_OFFLOAD_THRESHOLD = int(os.environ.get('ANALYZER_ASYNC_OFFLOAD_THRESHOLD', 64 * 1024))
+# Serve the create, detail, listing and natural language endpoints with native
+# async views (HNG2/asgi.py turns this on)
+ANALYZER_ASYNC_VIEWS = os.environ.get('ANALYZER_ASYNC_VIEWS', '').lower() in ('1', 'true')
+
+# Storage backend: the per-process in-memory store, or
+# 'analyzer.storage.DatabaseStringStore' to share data between worker processes
+ANALYZER_STORAGE_BACKEND = os.environ.get('ANALYZER_STORAGE_BACKEND', 'analyzer.storage.InMemoryStringStore')
+
+# Answer scalar filters on the in-memory store with vectorized column scans
+ANALYZER_COLUMNAR = os.environ.get('ANALYZER_COLUMNAR', '').lower() in ('1', 'true')
+
+# Index trigrams of every stored value for substring filters (slower inserts and startup)
+ANALYZER_NGRAM_INDEX = os.environ.get('ANALYZER_NGRAM_INDEX', '').lower() in ('1', 'true')
+
+# Persistence for the in-memory store: set ANALYZER_DATA_DIR to keep strings across restarts
+ANALYZER_DATA_DIR = os.environ.get('ANALYZER_DATA_DIR') or None
+# fsync policy for the write-ahead log: 'always', 'batch' or 'off'
+ANALYZER_FSYNC = os.environ.get('ANALYZER_FSYNC', 'batch')
+ANALYZER_FSYNC_BATCH_SIZE = int(os.environ.get('ANALYZER_FSYNC_BATCH_SIZE', 100))
+# Log records written before the store is compacted into a new snapshot
+ANALYZER_SNAPSHOT_EVERY = int(os.environ.get('ANALYZER_SNAPSHOT_EVERY', 100000))
+
+# Capacity limits for the in-memory store (0 disables each): entry count,
+# approximate bytes, seconds an entry lives after created_at, and whether
+# 'lru' (least recently read) or 'fifo' (oldest inserted) entries go first
+ANALYZER_MAX_ENTRIES = int(os.environ.get('ANALYZER_MAX_ENTRIES', 0))
+ANALYZER_MAX_BYTES = int(os.environ.get('ANALYZER_MAX_BYTES', 0))
+ANALYZER_ENTRY_TTL = int(os.environ.get('ANALYZER_ENTRY_TTL', 0))
+ANALYZER_EVICTION_POLICY = os.environ.get('ANALYZER_EVICTION_POLICY', 'lru')
+
+# Changes the in-memory store keeps for GET /strings/changes (0 disables the
+# feed) and the longest a long-poll request may wait, in seconds
+ANALYZER_CHANGE_FEED_SIZE = int(os.environ.get('ANALYZER_CHANGE_FEED_SIZE', 10000))
+ANALYZER_CHANGES_MAX_WAIT = float(os.environ.get('ANALYZER_CHANGES_MAX_WAIT', 30))
+
+# Listing results kept in the query cache (0 disables it)
+ANALYZER_QUERY_CACHE_SIZE = int(os.environ.get('ANALYZER_QUERY_CACHE_SIZE', 256))
+
+# Profile one request in N with cProfile (0 disables) and dump the stats here
+ANALYZER_PROFILE_EVERY = int(os.environ.get('ANALYZER_PROFILE_EVERY', 0))
+ANALYZER_PROFILE_DIR = os.environ.get('ANALYZER_PROFILE_DIR') or str(BASE_DIR / 'profiles')
@@ -0,0 +1,47 @@
+"""
+Lean production settings for serving only the string analyzer API.
+
+Select it with ``DJANGO_SETTINGS_MODULE=HNG2.settings_api``. It keeps the
+storage and analyzer configuration of ``HNG2.settings`` but drops the apps,
+middleware and template machinery the JSON API never uses (admin, auth,
+sessions, messages, CSRF) and turns DEBUG off, which also stops Django from
+recording every SQL query. DRF is limited to JSON rendering and parsing with
+no authentication step.
+
+``python -m analyzer.benchmarks`` compares cold start and per-request time
+against the default settings.
+"""
+
+import os
+
+from .settings import *  # noqa: F401,F403
+
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', SECRET_KEY)  # noqa: F405
+
+DEBUG = os.environ.get('DJANGO_DEBUG', '').lower() in ('1', 'true')
+
+ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', '*').split(',')
+
+INSTALLED_APPS = [
+    'analyzer.apps.AnalyzerConfig',
+]
+
+MIDDLEWARE = [
+    'analyzer.middleware.MetricsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+# Nothing renders templates: DRF only speaks JSON here
+TEMPLATES = []
+
+USE_I18N = False
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+    'DEFAULT_PARSER_CLASSES': ['rest_framework.parsers.JSONParser'],
+    'DEFAULT_AUTHENTICATION_CLASSES': [],
+    'DEFAULT_PERMISSION_CLASSES': [],
+    # Without django.contrib.auth there is no AnonymousUser to fall back on
+    'UNAUTHENTICATED_USER': None,
+}
@@ -1,3 +1,10 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import AnalyzedString
+
+
+@admin.register(AnalyzedString)
+class AnalyzedStringAdmin(admin.ModelAdmin):
+    list_display = ('value', 'length', 'is_palindrome', 'word_count', 'created_at')
+    list_filter = ('is_palindrome',)
+    search_fields = ('value',)
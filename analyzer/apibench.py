@@ -0,0 +1,316 @@
+"""End-to-end API benchmarks over synthetic corpora.
+
+Seeds a store with a reproducible corpus, then drives the create, detail,
+filtered listing, natural language and delete endpoints one request at a
+time, either in process through the Django test client or over HTTP
+against a gunicorn server started for the run. Results are plain dicts
+(see ``run_benchmark``) meant to be dumped as JSON and diffed between
+commits; ``python manage.py benchmark`` is the command-line entry point.
+"""
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import quote, urlencode
+
+import django
+from django.conf import settings
+from django.test import Client
+
+from . import views
+from .loadtest import Stats
+from .storage import DEFAULT_BACKEND, InMemoryStringStore
+from .utils import compute_properties
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+SCENARIOS = ('create', 'detail', 'list', 'nl', 'delete')
+DISTRIBUTIONS = ('uniform', 'lognormal', 'fixed')
+
+WORDS = ('level', 'radar', 'lorem', 'ipsum', 'dolor', 'sit', 'amet', 'noon', 'a', 'racecar', 'analyzer', 'xyz')
+
+# Filtered listings and natural language queries cycled through by the list and nl scenarios
+LIST_QUERIES = (
+    {'min_length': 10, 'max_length': 60, 'limit': 50},
+    {'is_palindrome': 'false', 'word_count': 3, 'limit': 50},
+    {'contains_character': 'z', 'limit': 50},
+    {'contains': 'lorem ip', 'min_length': 20, 'limit': 50},
+)
+NL_QUERIES = (
+    'all single word palindromic strings',
+    'strings longer than 40 characters',
+    'strings containing the letter z',
+    "two word strings containing 'or'",
+)
+
+BATCH_SEED_SIZE = 5000
+
+
+def make_value(rng, length):
+    """Return a word-like string of at most length characters."""
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return ' '.join(words)[:length].strip() or 'a'
+
+
+def make_lengths(rng, count, distribution='lognormal', min_length=1, max_length=200):
+    """Draw count string lengths from the named distribution, clamped to the bounds."""
+    if distribution == 'fixed':
+        return [max_length] * count
+    if distribution == 'uniform':
+        return [rng.randint(min_length, max_length) for _ in range(count)]
+    if distribution == 'lognormal':
+        # Mostly short strings with a long tail, median near the geometric mean
+        mu = (math.log(max(1, min_length)) + math.log(max(1, max_length))) / 2
+        return [min(max_length, max(min_length, round(rng.lognormvariate(mu, 0.75)))) for _ in range(count)]
+    raise ValueError(f'Unknown length distribution: {distribution}')
+
+
+def make_corpus(size, distribution='lognormal', min_length=1, max_length=200, seed=0):
+    """Return size distinct synthetic values, the same for the same arguments."""
+    rng = random.Random(seed)
+    values = {}
+    for length in make_lengths(rng, size * 2, distribution, min_length, max_length):
+        value = make_value(rng, length)
+        # Suffix a counter so short lengths still yield distinct values
+        if value in values:
+            value = f'{value} {len(values)}'
+        values[value] = None
+        if len(values) == size:
+            break
+    while len(values) < size:
+        values[f'{make_value(rng, min_length)} {len(values)}'] = None
+    return list(values)
+
+
+class ClientTransport:
+    """Sends requests through the Django test client, in this process."""
+
+    name = 'client'
+
+    def __init__(self):
+        self.client = Client()
+
+    def request(self, method, path, body=None):
+        if body is None:
+            return getattr(self.client, method.lower())(path).status_code
+        return getattr(self.client, method.lower())(path, body, content_type='application/json').status_code
+
+    def seed(self, values):
+        store = views.strings_storage
+        for value in values:
+            properties = compute_properties(value)
+            store.add(views.build_entry(value, properties))
+
+
+class HTTPTransport:
+    """Sends requests over HTTP/1.1 to a running server."""
+
+    name = 'http'
+
+    def __init__(self, host, port):
+        self.connection = http.client.HTTPConnection(host, port, timeout=60)
+
+    def request(self, method, path, body=None):
+        headers = {}
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        response.read()
+        if response.getheader('Connection', '').lower() == 'close':
+            self.connection.close()
+        return response.status
+
+    def seed(self, values):
+        for start in range(0, len(values), BATCH_SEED_SIZE):
+            status = self.request('POST', '/strings/batch', values[start:start + BATCH_SEED_SIZE])
+            if status != 200:
+                raise RuntimeError(f'Seeding failed with HTTP {status}')
+
+    def close(self):
+        self.connection.close()
+
+
+def run_scenario(transport, requests):
+    """Time each (method, path, body) request; return the latency summary."""
+    stats = Stats()
+    started = time.perf_counter()
+    for method, path, body in requests:
+        request_started = time.perf_counter()
+        try:
+            status = transport.request(method, path, body)
+        except (OSError, http.client.HTTPException):
+            stats.errors += 1
+            continue
+        stats.record(status, time.perf_counter() - request_started)
+    return stats.summary(time.perf_counter() - started)
+
+
+def build_requests(scenario, corpus, count, rng):
+    """Return the requests a scenario sends, deterministic for a seeded rng."""
+    if scenario == 'create':
+        return [('POST', '/strings', {'value': f'bench create {rng.random()} {number}'}) for number in range(count)]
+    if scenario == 'detail':
+        return [('GET', '/strings/' + quote(rng.choice(corpus), safe=''), None) for _ in range(count)]
+    if scenario == 'list':
+        return [('GET', '/strings?' + urlencode(LIST_QUERIES[number % len(LIST_QUERIES)]), None) for number in range(count)]
+    if scenario == 'nl':
+        return [
+            ('GET', '/strings/filter-by-natural-language?' + urlencode({'query': NL_QUERIES[number % len(NL_QUERIES)]}), None)
+            for number in range(count)
+        ]
+    if scenario == 'delete':
+        victims = rng.sample(corpus, min(count, len(corpus)))
+        return [('DELETE', '/strings/' + quote(value, safe=''), None) for value in victims]
+    raise ValueError(f'Unknown scenario: {scenario}')
+
+
+@contextmanager
+def isolated_store():
+    """Point the views at a fresh in-memory store so a run never touches real data."""
+    previous = views.strings_storage
+    views.strings_storage = InMemoryStringStore(
+        columnar=getattr(settings, 'ANALYZER_COLUMNAR', False),
+        ngram_index=getattr(settings, 'ANALYZER_NGRAM_INDEX', False),
+    )
+    views.query_cache.clear()
+    try:
+        yield views.strings_storage
+    finally:
+        views.strings_storage = previous
+        views.query_cache.clear()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def gunicorn_server(workers=1, threads=1, timeout=30):
+    """Start gunicorn on a free local port for the duration of the block; yields the port.
+
+    The server gets an empty, non-persistent in-memory store. With several
+    workers each one holds its own store, so use one worker or the database
+    backend when every request must see the seeded corpus.
+    """
+    port = free_port()
+    env = dict(os.environ, ANALYZER_DATA_DIR='', DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'HNG2.settings'))
+    command = [
+        sys.executable, '-m', 'gunicorn', 'HNG2.wsgi',
+        '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--threads', str(threads),
+        '--log-level', 'warning',
+    ]
+    process = subprocess.Popen(command, cwd=PROJECT_DIR, env=env)
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f'gunicorn exited with status {process.returncode}')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError('gunicorn did not start in time')
+                time.sleep(0.1)
+        yield port
+    finally:
+        process.terminate()
+        process.wait(timeout=timeout)
+
+
+def environment():
+    """Describe what was measured, so result files can be told apart."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'settings': settings.SETTINGS_MODULE,
+    }
+
+
+def run_benchmark(target='client', corpus_size=10000, requests=1000, scenarios=SCENARIOS,
+                  distribution='lognormal', min_length=1, max_length=200, seed=0, workers=1, threads=1):
+    """Seed a corpus and time every scenario against the chosen target.
+
+    Returns a dict with the run parameters, environment and, per scenario,
+    the request count, throughput and p50/p95/p99 latency in milliseconds.
+    """
+    corpus = make_corpus(corpus_size, distribution, min_length, max_length, seed)
+    parameters = {
+        'target': target,
+        'corpus_size': corpus_size,
+        'requests': requests,
+        'distribution': distribution,
+        'min_length': min_length,
+        'max_length': max_length,
+        'seed': seed,
+    }
+    if target == 'gunicorn':
+        parameters.update(workers=workers, threads=threads, storage_backend=settings.ANALYZER_STORAGE_BACKEND)
+    else:
+        parameters['storage_backend'] = DEFAULT_BACKEND
+
+    results = {}
+
+    def run_all(transport):
+        seeded = time.perf_counter()
+        transport.seed(corpus)
+        results['seed'] = {'entries': len(corpus), 'seconds': round(time.perf_counter() - seeded, 3)}
+        rng = random.Random(seed)
+        for scenario in scenarios:
+            results[scenario] = run_scenario(transport, build_requests(scenario, corpus, requests, rng))
+
+    if target == 'client':
+        with isolated_store():
+            run_all(ClientTransport())
+    elif target == 'gunicorn':
+        with gunicorn_server(workers=workers, threads=threads) as port:
+            transport = HTTPTransport('127.0.0.1', port)
+            try:
+                run_all(transport)
+            finally:
+                transport.close()
+    else:
+        raise ValueError(f'Unknown target: {target}')
+    return {'parameters': parameters, 'environment': environment(), 'results': results}
+
+
+def compare(report, baseline):
+    """Ratio of each scenario's throughput and latency percentiles to a baseline report.
+
+    Above 1 means more requests per second or slower percentiles than the
+    baseline.
+    """
+    comparison = {}
+    for scenario, result in report['results'].items():
+        previous = baseline.get('results', {}).get(scenario)
+        if previous is None or scenario == 'seed':
+            continue
+        comparison[scenario] = {
+            key: round(result[key] / previous[key], 3) if result.get(key) and previous.get(key) else None
+            for key in ('requests_per_second', 'p50_ms', 'p95_ms', 'p99_ms')
+        }
+    return comparison
@@ -0,0 +1,204 @@
+"""Native async versions of the create, detail, listing, natural language and change feed views.
+
+Under ASGI a sync DRF view costs a thread hop per request. These handlers run
+on the event loop instead: analysis of large strings is awaited on an
+executor (see engine.analyze_async) and store calls only leave the loop when
+the backend may block on I/O or a writer holds the in-memory store's lock.
+They share the store, query cache and request parsing with analyzer.views
+and answer with the same JSON bodies.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from . import views
+from .changes import (
+    EVENT_STREAM_CONTENT_TYPE, ChangeFeedError, changes_response_data, event_stream_async, parse_changes_params,
+    wants_event_stream,
+)
+from .engine import analyze_async
+from .etags import entry_etag, etag_matches, listing_etag
+from .eviction import EntryTooLarge
+from .filters import FilterError, parse_fields, parse_filters
+from .metrics import timed
+from .nlquery import QueryConflictError, QueryError, parse_query
+from .pagination import PaginationError, encode_listing, next_cursor, parse_page_params, stream_listing, wants_stream
+from .utils import compute_hash
+
+# Same compact, non-ASCII-escaping encoding as DRF's JSONRenderer
+JSON_DUMPS_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+def json_response(data, status=200, etag=None):
+    response = JsonResponse(data, status=status, json_dumps_params=JSON_DUMPS_PARAMS)
+    if etag is not None:
+        response['ETag'] = etag
+    return response
+
+
+def error_response(message, status):
+    return json_response({'error': message}, status=status)
+
+
+def not_modified_response(etag):
+    response = HttpResponseNotModified()
+    response['ETag'] = etag
+    return response
+
+
+def listing_response(request, page, etag, **fields):
+    """Answer with a page of entries encoded as JSON bytes, streamed when asked to."""
+    fields = {'count': page.count, **fields, 'next_cursor': next_cursor(page)}
+    if wants_stream(request.GET):
+        response = stream_listing(page.entries, **fields)
+    else:
+        response = HttpResponse(encode_listing(page.entries, **fields), content_type='application/json')
+    if etag is not None:
+        response['ETag'] = etag
+    return response
+
+
+async def call_store(func, *args, **kwargs):
+    """Call func on the event loop when it cannot block, otherwise on a worker thread.
+
+    Backends that may block on I/O always go to a thread. The in-memory
+    store runs inline only while its lock is free, so a sync view holding it
+    for a whole batch never stalls the loop.
+    """
+    store = views.strings_storage
+    if store.blocking:
+        return await sync_to_async(func)(*args, **kwargs)
+    with store.lock_if_free() as held:
+        if held:
+            return func(*args, **kwargs)
+    # The store is thread-safe, so skip the thread the sync views are queued on
+    return await sync_to_async(func, thread_sensitive=False)(*args, **kwargs)
+
+
+class AsyncAPIView(View):
+    """Base for the async JSON endpoints; like APIView they are exempt from CSRF."""
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+
+class StringListCreateView(AsyncAPIView):
+    async def post(self, request):
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError as exc:
+            return json_response({'detail': f'JSON parse error - {exc}'}, status=400)
+        value = data.get('value') if isinstance(data, dict) else None
+        if not value:
+            return error_response('Missing "value" field', 400)
+        if not isinstance(value, str):
+            return error_response('"value" must be a string', 422)
+
+        with timed('analyze'):
+            properties = await analyze_async(value)
+        entry = views.build_entry(value, properties)
+        try:
+            with timed('store'):
+                added = await call_store(views.strings_storage.add, entry)
+        except EntryTooLarge as exc:
+            return error_response(str(exc), 413)
+        if not added:
+            return error_response('String already exists', 409)
+        return json_response(entry, status=201)
+
+    async def get(self, request):
+        store = views.strings_storage
+        etag = await call_store(listing_etag, store, request.GET)
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+
+        try:
+            filters = parse_filters(request.GET)
+            fields = parse_fields(request.GET)
+            after, limit = parse_page_params(request.GET)
+        except (FilterError, PaginationError) as exc:
+            return error_response(str(exc), 400)
+
+        with timed('query'):
+            page = await call_store(
+                views.query_page, store, filters, wants_stream(request.GET), after=after, limit=limit, fields=fields,
+            )
+        return listing_response(request, page, etag, filters_applied=filters)
+
+
+class StringDetailView(AsyncAPIView):
+    async def get(self, request, string_value):
+        entry_id = compute_hash(string_value)
+        etag = entry_etag(entry_id)
+        with timed('store'):
+            entry = await call_store(views.strings_storage.get, entry_id)
+        if entry is None:
+            return json_response({'detail': 'Not found.'}, status=404)
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+        return json_response(entry, etag=etag)
+
+    async def delete(self, request, string_value):
+        entry_id = compute_hash(string_value)
+        with timed('store'):
+            entry = await call_store(views.strings_storage.pop, entry_id, None)
+        if entry is None:
+            return json_response({'detail': 'Not found.'}, status=404)
+        return HttpResponse(status=204)
+
+
+class StringNaturalLanguageFilterView(AsyncAPIView):
+    async def get(self, request):
+        store = views.strings_storage
+        etag = await call_store(listing_etag, store, request.GET)
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+
+        query = request.GET.get('query', '')
+        if not query:
+            return error_response('Missing query parameter', 400)
+        try:
+            parsed_filters = parse_query(query)
+        except QueryConflictError as exc:
+            return error_response(str(exc), 422)
+        except QueryError as exc:
+            return error_response(str(exc), 400)
+        try:
+            fields = parse_fields(request.GET)
+            after, limit = parse_page_params(request.GET)
+        except (FilterError, PaginationError) as exc:
+            return error_response(str(exc), 400)
+
+        with timed('query'):
+            page = await call_store(
+                views.query_page, store, parsed_filters, wants_stream(request.GET), after=after, limit=limit,
+                fields=fields,
+            )
+        interpreted_query = {'original': query, 'parsed_filters': parsed_filters}
+        return listing_response(request, page, etag, interpreted_query=interpreted_query)
+
+
+class StringChangesView(AsyncAPIView):
+    async def get(self, request):
+        feed = views.strings_storage.changes
+        if feed is None:
+            return error_response('The change feed is not available with this storage backend', 501)
+        try:
+            since, wait = parse_changes_params(request.GET, request.headers.get('Last-Event-ID'))
+        except ChangeFeedError as exc:
+            return error_response(str(exc), 400)
+        if since is None:
+            since = feed.now()
+
+        if wants_event_stream(request):
+            # An async iterator, so each open stream costs a coroutine rather than a thread
+            response = StreamingHttpResponse(event_stream_async(feed, since), content_type=EVENT_STREAM_CONTENT_TYPE)
+            response['Cache-Control'] = 'no-cache'
+            return response
+        changes, last_seq = await feed.wait_async(since, wait) if wait else feed.since(since)
+        return json_response(changes_response_data(feed, changes, last_seq))
@@ -0,0 +1,271 @@
+"""Micro-benchmarks for the string analyzer.
+
+These are plain functions returning timing results so they can be run from a
+shell (``python -m analyzer.benchmarks``) or exercised at small sizes by the
+test suite.
+"""
+import gc
+import hashlib
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+
+from . import columnar as columnar_module
+from .persistence import FSYNC_OFF, AppendOnlyLog
+from .records import StringRecord
+from .storage import InMemoryStringStore
+from .utils import compute_properties
+
+# Input sizes in characters: 10 B, 1 KB, 1 MB and 50 MB
+COMPUTE_PROPERTIES_SIZES = (10, 1024, 1024 * 1024, 50 * 1024 * 1024)
+
+
+def reference_compute_properties(value):
+    """The original multi-pass compute_properties, kept as a baseline."""
+    length = len(value)
+    is_palindrome = value.lower() == value.lower()[::-1]
+    unique_characters = len(set(value))
+    word_count = len(value.split())
+    sha256_hash = hashlib.sha256(value.encode()).hexdigest()
+    character_frequency_map = dict(Counter(value))
+    return {
+        'length': length,
+        'is_palindrome': is_palindrome,
+        'unique_characters': unique_characters,
+        'word_count': word_count,
+        'sha256_hash': sha256_hash,
+        'character_frequency_map': character_frequency_map,
+    }
+
+
+def make_text(size, seed=0):
+    """Return deterministic word-like text of exactly size characters."""
+    words = ('lorem', 'ipsum', 'Level', 'radar', 'dolor', 'sit', 'amet', str(seed))
+    text = ' '.join(words)
+    return (text * (size // len(text) + 1))[:size]
+
+
+def best_of(func, *args, repeats=3):
+    """Return the fastest wall-clock time in seconds over repeats calls."""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark_compute_properties(sizes=COMPUTE_PROPERTIES_SIZES, repeats=3):
+    """Time the reference and current compute_properties across input sizes."""
+    results = []
+    for size in sizes:
+        value = make_text(size)
+        reference = best_of(reference_compute_properties, value, repeats=repeats)
+        current = best_of(compute_properties, value, repeats=repeats)
+        results.append({
+            'size': size,
+            'reference_seconds': reference,
+            'current_seconds': current,
+            'speedup': reference / current if current else None,
+        })
+    return results
+
+
+def make_entries(count, prefix='bench'):
+    """Yield count analyzed entries shaped like the ones the API stores."""
+    for i in range(count):
+        value = f'{prefix} {i} ' + make_text(i % 64, seed=i)
+        properties = compute_properties(value)
+        yield {
+            'id': properties['sha256_hash'],
+            'value': value,
+            'properties': properties,
+            'created_at': '2025-01-01T00:00:00Z',
+        }
+
+
+def benchmark_persistence_startup(count=1000000, tail=10000):
+    """Time rebuilding a store from a snapshot of count entries plus a log tail."""
+    with tempfile.TemporaryDirectory() as directory:
+        log = AppendOnlyLog(directory, fsync=FSYNC_OFF, snapshot_every=count + tail + 1)
+        log.snapshot(StringRecord.from_entry(entry) for entry in make_entries(count))
+        for entry in make_entries(tail, prefix='tail'):
+            log.append_create(StringRecord.from_entry(entry))
+        log.close()
+
+        start = time.perf_counter()
+        store = InMemoryStringStore(log=AppendOnlyLog(directory))
+        elapsed = time.perf_counter() - start
+        store.log.close()
+    return {'entries': len(store), 'startup_seconds': elapsed}
+
+
+def _traced_bytes(build):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = build()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del kept
+    return after - before
+
+
+def benchmark_entry_memory(count=100000):
+    """Measure bytes per stored entry as API dicts versus compact StringRecords.
+
+    The values are shared by both layouts and not counted, so the figures
+    are the per-entry overhead on top of the string itself.
+    """
+    entries = list(make_entries(count))
+
+    def build_dict(entry):
+        # Decoding a fresh copy makes the id and timestamp count as they would for a POST
+        entry_id = entry['id'].encode().decode()
+        return {
+            'id': entry_id,
+            'value': entry['value'],
+            'properties': dict(
+                entry['properties'],
+                sha256_hash=entry_id,
+                character_frequency_map=dict(entry['properties']['character_frequency_map']),
+            ),
+            'created_at': entry['created_at'].encode().decode(),
+        }
+
+    dict_bytes = _traced_bytes(lambda: {entry['id']: build_dict(entry) for entry in entries})
+    record_bytes = _traced_bytes(lambda: {
+        record.digest: record for record in map(StringRecord.from_entry, entries)
+    })
+    value_bytes = sum(len(entry['value']) for entry in entries)
+    return {
+        'entries': count,
+        'average_value_length': value_bytes / count,
+        'dict_bytes_per_entry': dict_bytes / count,
+        'record_bytes_per_entry': record_bytes / count,
+    }
+
+
+# Sizes and an analytics-style query for the filter engine comparison
+FILTER_ENGINE_SIZES = (10000, 100000, 1000000)
+FILTER_ENGINE_QUERY = {'min_length': 20, 'max_length': 60, 'word_count': 6, 'is_palindrome': False}
+
+
+def scan_records(records, filters):
+    """The original per-entry filter chain, over records instead of dicts."""
+    matches = []
+    for record in records:
+        if 'is_palindrome' in filters and record.is_palindrome != filters['is_palindrome']:
+            continue
+        if 'min_length' in filters and record.length < filters['min_length']:
+            continue
+        if 'max_length' in filters and record.length > filters['max_length']:
+            continue
+        if 'word_count' in filters and record.word_count != filters['word_count']:
+            continue
+        if 'contains_character' in filters and filters['contains_character'] not in record.value:
+            continue
+        matches.append(record)
+    return matches
+
+
+def benchmark_filter_engines(sizes=FILTER_ENGINE_SIZES, filters=FILTER_ENGINE_QUERY, repeats=3):
+    """Time a filtered query with a full scan, the property indexes and the columnar engine.
+
+    Only the filtering step is timed; turning matches into API dicts costs the
+    same for every engine.
+    """
+    results = []
+    for size in sizes:
+        store = InMemoryStringStore(columnar=True)
+        for entry in make_entries(size):
+            store.add(entry)
+        records = list(store._records.values())
+        scan = best_of(scan_records, records, filters, repeats=repeats)
+        indexed = best_of(store.index.select, filters, repeats=repeats)
+        columnar = best_of(store.columns.select, filters, repeats=repeats)
+        results.append({
+            'entries': size,
+            'matches': len(store.columns.select(filters)),
+            'scan_seconds': scan,
+            'index_seconds': indexed,
+            'columnar_seconds': columnar,
+            'numpy': columnar_module.numpy is not None,
+        })
+    return results
+
+
+# Settings modules compared by benchmark_settings_profiles
+SETTINGS_PROFILES = ('HNG2.settings', 'HNG2.settings_api')
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+# Run in a fresh interpreter per profile: Django settings load once per process
+_SETTINGS_PROFILE_SCRIPT = """
+import io, json, os, sys, time
+started = time.perf_counter()
+os.environ['DJANGO_SETTINGS_MODULE'] = sys.argv[1]
+from django.core.wsgi import get_wsgi_application
+from django.urls import resolve
+from wsgiref.util import setup_testing_defaults
+application = get_wsgi_application()
+resolve('/strings')
+startup = time.perf_counter() - started
+
+from analyzer import benchmarks, views
+entry = next(benchmarks.make_entries(1))
+views.strings_storage.add(entry)
+
+def request_seconds(path, query, count):
+    environ = {'PATH_INFO': path, 'QUERY_STRING': query}
+    setup_testing_defaults(environ)
+    started = time.perf_counter()
+    for _ in range(count):
+        environ['wsgi.input'] = io.BytesIO()
+        body = application(dict(environ), lambda status, headers, exc_info=None: None)
+        b''.join(body)
+        body.close()
+    return (time.perf_counter() - started) / count
+
+count = int(sys.argv[2])
+print(json.dumps({
+    'startup_seconds': startup,
+    'listing_request_seconds': request_seconds('/strings', 'limit=20', count),
+    'detail_request_seconds': request_seconds('/strings/' + entry['value'], '', count),
+}))
+views.strings_storage.pop(entry['id'])
+"""
+
+
+def benchmark_settings_profiles(profiles=SETTINGS_PROFILES, requests=2000):
+    """Measure cold start and per-request time of the WSGI app under each settings module.
+
+    Startup covers importing Django, loading settings and apps, building the
+    WSGI handler and importing the URLconf. Requests are fed straight into
+    the handler so only Django and the view are timed, not a server.
+    """
+    results = []
+    for profile in profiles:
+        output = subprocess.run(
+            [sys.executable, '-c', _SETTINGS_PROFILE_SCRIPT, profile, str(requests)],
+            capture_output=True, text=True, check=True, cwd=PROJECT_DIR,
+        ).stdout
+        results.append({'settings': profile, **json.loads(output.splitlines()[-1])})
+    return results
+
+
+if __name__ == '__main__':
+    for row in benchmark_settings_profiles():
+        print('{settings:<20} startup {startup_seconds:.3f}s  listing {listing_request_seconds:.6f}s  detail {detail_request_seconds:.6f}s'.format(**row))
+    for row in benchmark_filter_engines():
+        print('{entries:>8} entries  scan {scan_seconds:.4f}s  index {index_seconds:.4f}s  columnar {columnar_seconds:.4f}s'.format(**row))
+    print('entry memory: {dict_bytes_per_entry:.0f} B as dicts, {record_bytes_per_entry:.0f} B as records'.format(**benchmark_entry_memory()))
+    print('persistence startup: {entries} entries in {startup_seconds:.2f}s'.format(**benchmark_persistence_startup()))
+    for row in benchmark_compute_properties():
+        print('{size:>10} B  reference {reference_seconds:.6f}s  current {current_seconds:.6f}s  x{speedup:.2f}'.format(**row))
@@ -0,0 +1,78 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+DEFAULT_QUERY_CACHE_SIZE = 256
+
+
+class QueryCache:
+    """LRU cache of listing query results, invalidated by the store generation.
+
+    Results are keyed on the normalized filter dict, the page requested and
+    the entry projection and encoding asked for.
+    Every insert and delete bumps the store's generation, and the first
+    lookup that sees a new generation drops every cached result, so a cached
+    page is never served after the data behind it changed.
+    """
+
+    def __init__(self, maxsize=DEFAULT_QUERY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._results = OrderedDict()
+        self._generation = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(filters, after=None, limit=None, fields=None, encoded=False):
+        return tuple(sorted(filters.items())), after, limit, fields, encoded
+
+    def query(self, store, filters, after=None, limit=None, fields=None, encoded=False):
+        """Return store.query(filters, ...), from the cache when still valid."""
+        if not self.maxsize or store.generation is None:
+            return store.query(filters, after=after, limit=limit, fields=fields, encoded=encoded)
+
+        generation = (id(store), store.generation)
+        key = self.make_key(filters, after, limit, fields, encoded)
+        with self._lock:
+            if generation != self._generation:
+                self._results.clear()
+                self._generation = generation
+            page = self._results.get(key)
+            if page is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return page
+            self.misses += 1
+
+        page = store.query(filters, after=after, limit=limit, fields=fields, encoded=encoded)
+        with self._lock:
+            # Only keep the result if no write happened while computing it
+            if generation == self._generation == (id(store), store.generation):
+                self._results[key] = page
+                if len(self._results) > self.maxsize:
+                    self._results.popitem(last=False)
+                    self.evictions += 1
+        return page
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self._generation = None
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'size': len(self._results),
+            'maxsize': self.maxsize,
+        }
+
+
+def build_query_cache():
+    return QueryCache(maxsize=getattr(settings, 'ANALYZER_QUERY_CACHE_SIZE', DEFAULT_QUERY_CACHE_SIZE))
@@ -0,0 +1,235 @@
+"""Sequenced feed of inserts and deletes, so clients can follow the store.
+
+Every change the in-memory store makes (create, delete, eviction, clear)
+gets the next sequence number and goes into a bounded ring buffer. A
+client asks for everything after the last position it saw, and may wait
+for the next change instead of polling. Sequence numbers restart with the
+process, so positions are given out as ``<epoch>:<seq>`` cursors naming
+the store's epoch too. When a client asks for changes the buffer no
+longer holds, or from a cursor of another epoch (before a restart, or
+from another worker), it is told to resync: refetch the listing, then
+follow the feed from the ``last_seq`` cursor it was given.
+"""
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import deque, namedtuple
+from itertools import islice
+
+from django.conf import settings
+
+DEFAULT_CHANGE_FEED_SIZE = 10000
+
+# Long-poll waits and Server-Sent Event streams are capped so workers recycle
+DEFAULT_MAX_WAIT = 30
+SSE_STREAM_SECONDS = 300
+SSE_HEARTBEAT_SECONDS = 15
+# Milliseconds an EventSource waits before reconnecting with Last-Event-ID
+SSE_RETRY_MS = 1000
+SSE_PREAMBLE = f'retry: {SSE_RETRY_MS}\n\n'.encode()
+HEARTBEAT = b': keepalive\n\n'
+
+EVENT_STREAM_CONTENT_TYPE = 'text/event-stream'
+
+CREATE = 'create'
+DELETE = 'delete'
+CLEAR = 'clear'
+
+Change = namedtuple('Change', ['seq', 'op', 'record'])
+
+
+class ChangeFeedError(ValueError):
+    """Raised when the since or wait query parameters are invalid."""
+
+
+class ChangeFeed:
+    """Ring buffer of the last ``size`` changes, with blocking waits for new ones.
+
+    Changes keep a reference to the StringRecord involved and are only
+    serialized when read, so recording one costs a tuple and a notify.
+    Threads wait on a condition; coroutines register a future that is
+    resolved on their own event loop, so they do not hold a thread.
+
+    Reads take an ``(epoch, seq)`` pair, as parse_changes_params returns;
+    the store sets ``epoch`` to its own when it adopts the feed.
+    """
+
+    def __init__(self, size=DEFAULT_CHANGE_FEED_SIZE):
+        self.size = size
+        self.epoch = uuid.uuid4().hex[:8]
+        self.last_seq = 0
+        self._changes = deque(maxlen=size)
+        self._condition = threading.Condition()
+        self._futures = []
+
+    @classmethod
+    def from_settings(cls):
+        """Return the feed configured in settings, or None when it is disabled."""
+        size = getattr(settings, 'ANALYZER_CHANGE_FEED_SIZE', DEFAULT_CHANGE_FEED_SIZE)
+        return cls(size) if size else None
+
+    def append(self, op, record=None):
+        with self._condition:
+            self.last_seq += 1
+            self._changes.append(Change(self.last_seq, op, record))
+            self._condition.notify_all()
+            futures, self._futures = self._futures, []
+        for loop, future in futures:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def cursor(self, seq=None):
+        """Return the cursor for seq, by default the current position."""
+        return f'{self.epoch}:{self.last_seq if seq is None else seq}'
+
+    def now(self):
+        """Return the (epoch, seq) position of the latest change."""
+        return self.epoch, self.last_seq
+
+    def since(self, since):
+        """Return (changes after since, last_seq); changes is None when the client must resync."""
+        with self._condition:
+            return self._since(since), self.last_seq
+
+    def wait(self, since, timeout):
+        """Like since, but block up to timeout seconds for a change after since."""
+        with self._condition:
+            self._condition.wait_for(lambda: self.now() != since, timeout)
+            return self._since(since), self.last_seq
+
+    async def wait_async(self, since, timeout):
+        """Coroutine version of wait."""
+        loop = asyncio.get_running_loop()
+        with self._condition:
+            if self.now() != since:
+                return self._since(since), self.last_seq
+            future = loop.create_future()
+            self._futures.append((loop, future))
+        try:
+            await asyncio.wait([future], timeout=timeout)
+        finally:
+            with self._condition:
+                # append() may already have taken it, with _resolve still queued on the loop;
+                # a cancelled wait (client gone) must not leave it behind either
+                if (loop, future) in self._futures:
+                    self._futures.remove((loop, future))
+        with self._condition:
+            return self._since(since), self.last_seq
+
+    def _since(self, since):
+        epoch, seq = since
+        if epoch != self.epoch or seq > self.last_seq:
+            # A cursor from before a restart, or from another process
+            return None
+        oldest = self._changes[0].seq if self._changes else self.last_seq + 1
+        if seq < oldest - 1:
+            # The changes right after seq have already been dropped
+            return None
+        # Sequence numbers are contiguous, so the position follows from them
+        return list(islice(self._changes, seq - oldest + 1, None))
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+def change_to_dict(change):
+    data = {'seq': change.seq, 'op': change.op}
+    if change.op == CREATE:
+        data['id'] = change.record.id
+        data['entry'] = change.record.to_dict()
+    elif change.op == DELETE:
+        data['id'] = change.record.id
+    return data
+
+
+def parse_cursor(cursor):
+    """Return the (epoch, seq) pair of an ``<epoch>:<seq>`` cursor.
+
+    A bare sequence number has no epoch, so it never matches the feed's and
+    reads of it ask the client to resync.
+    """
+    epoch, _, seq = cursor.rpartition(':')
+    try:
+        seq = int(seq)
+    except ValueError:
+        raise ChangeFeedError('Invalid since')
+    if seq < 0:
+        raise ChangeFeedError('since must not be negative')
+    return epoch or None, seq
+
+
+def parse_changes_params(query_params, last_event_id=None):
+    """Return (since, wait) from the query parameters; since is None for "from now"."""
+    since = last_event_id or query_params.get('since')
+    if since is not None:
+        since = parse_cursor(since)
+    wait = 0.0
+    if 'wait' in query_params:
+        try:
+            wait = float(query_params['wait'])
+        except ValueError:
+            raise ChangeFeedError('Invalid wait')
+        if not 0 <= wait < float('inf'):
+            raise ChangeFeedError('wait must be a non-negative number of seconds')
+        wait = min(wait, getattr(settings, 'ANALYZER_CHANGES_MAX_WAIT', DEFAULT_MAX_WAIT))
+    return since, wait
+
+
+def changes_response_data(feed, changes, last_seq):
+    if changes is None:
+        return {'changes': [], 'last_seq': feed.cursor(last_seq), 'resync': True}
+    return {'changes': [change_to_dict(change) for change in changes], 'last_seq': feed.cursor(last_seq), 'resync': False}
+
+
+def wants_event_stream(request):
+    return EVENT_STREAM_CONTENT_TYPE in request.headers.get('Accept', '')
+
+
+def format_event(event, data, event_id=None):
+    lines = [] if event_id is None else [f'id: {event_id}']
+    lines += [f'event: {event}', f'data: {json.dumps(data, ensure_ascii=False, separators=(",", ":"))}']
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+def format_changes(feed, changes, last_seq):
+    """Return the SSE bytes for one read of the feed (a resync event when changes is None)."""
+    if changes is None:
+        return format_event('resync', {'last_seq': feed.cursor(last_seq)})
+    return b''.join(format_event(change.op, change_to_dict(change), feed.cursor(change.seq)) for change in changes)
+
+
+def event_stream(feed, since, lifetime=SSE_STREAM_SECONDS):
+    """Yield Server-Sent Events for the changes after since.
+
+    Sends a heartbeat comment while idle and ends after lifetime seconds or
+    a resync event; EventSource clients reconnect on their own.
+    """
+    yield SSE_PREAMBLE
+    deadline = time.monotonic() + lifetime
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        changes, last_seq = feed.wait(since, min(SSE_HEARTBEAT_SECONDS, remaining))
+        yield format_changes(feed, changes, last_seq) if changes != [] else HEARTBEAT
+        if changes is None:
+            return
+        since = feed.epoch, last_seq
+
+
+async def event_stream_async(feed, since, lifetime=SSE_STREAM_SECONDS):
+    """Async generator version of event_stream for ASGI servers."""
+    yield SSE_PREAMBLE
+    deadline = time.monotonic() + lifetime
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        changes, last_seq = await feed.wait_async(since, min(SSE_HEARTBEAT_SECONDS, remaining))
+        yield format_changes(feed, changes, last_seq) if changes != [] else HEARTBEAT
+        if changes is None:
+            return
+        since = feed.epoch, last_seq
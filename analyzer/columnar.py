@@ -0,0 +1,115 @@
+"""Columnar mirror of the scalar string properties for vectorized filtering.
+
+With NumPy the columns are viewed as NumPy arrays without copying and
+filters become boolean masks. Without it the same columns are filtered one
+row at a time in pure Python, which is slower than the property indexes, so
+the ANALYZER_COLUMNAR setting requires NumPy (see requirements.txt).
+"""
+from array import array
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - depends on the environment
+    numpy = None
+
+# Compact once tombstoned rows outnumber live ones (and there are enough to matter)
+MIN_COMPACT_ROWS = 1024
+
+
+class ColumnarIndex:
+    """Scalar properties of stored records in contiguous columns, one row per record.
+
+    Rows are appended in insertion order and deletes only tombstone a row, so
+    matching rows always come back already in sequence order.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._rows = {}
+        self._deleted = 0
+        self.length = array('q')
+        self.word_count = array('q')
+        self.unique_characters = array('q')
+        self.is_palindrome = array('b')
+        self.alive = array('b')
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, record):
+        self._rows[record.digest] = len(self._keys)
+        self._keys.append(record.digest)
+        self.length.append(record.length)
+        self.word_count.append(record.word_count)
+        self.unique_characters.append(record.unique_characters)
+        self.is_palindrome.append(record.is_palindrome)
+        self.alive.append(1)
+
+    def remove(self, record):
+        row = self._rows.pop(record.digest)
+        self.alive[row] = 0
+        self._keys[row] = None
+        self._deleted += 1
+        if self._deleted > MIN_COMPACT_ROWS and self._deleted > len(self._rows):
+            self._compact()
+
+    def clear(self):
+        self.__init__()
+
+    def select(self, filters):
+        """Return the keys of live rows matching the scalar filters, in insertion order."""
+        if numpy is not None:
+            rows = self._select_numpy(filters)
+        else:
+            rows = self._select_python(filters)
+        keys = self._keys
+        return [keys[row] for row in rows]
+
+    def _select_numpy(self, filters):
+        def column(values, dtype):
+            return numpy.frombuffer(values, dtype=dtype) if len(values) else numpy.empty(0, dtype)
+
+        mask = column(self.alive, numpy.int8).astype(bool)
+        length = column(self.length, numpy.int64)
+        if 'min_length' in filters:
+            mask &= length >= filters['min_length']
+        if 'max_length' in filters:
+            mask &= length <= filters['max_length']
+        if 'word_count' in filters:
+            mask &= column(self.word_count, numpy.int64) == filters['word_count']
+        if 'is_palindrome' in filters:
+            mask &= column(self.is_palindrome, numpy.int8) == int(filters['is_palindrome'])
+        return numpy.flatnonzero(mask).tolist()
+
+    def _select_python(self, filters):
+        alive = self.alive
+        rows = [row for row in range(len(alive)) if alive[row]]
+        # Narrow one column at a time, cheapest equality checks first
+        if 'is_palindrome' in filters:
+            wanted = int(filters['is_palindrome'])
+            column = self.is_palindrome
+            rows = [row for row in rows if column[row] == wanted]
+        if 'word_count' in filters:
+            wanted = filters['word_count']
+            column = self.word_count
+            rows = [row for row in rows if column[row] == wanted]
+        if 'min_length' in filters:
+            low = filters['min_length']
+            column = self.length
+            rows = [row for row in rows if column[row] >= low]
+        if 'max_length' in filters:
+            high = filters['max_length']
+            column = self.length
+            rows = [row for row in rows if column[row] <= high]
+        return rows
+
+    def _compact(self):
+        live = [row for row in range(len(self.alive)) if self.alive[row]]
+        keys = self._keys
+        self._keys = [keys[row] for row in live]
+        self._rows = {key: row for row, key in enumerate(self._keys)}
+        for name in ('length', 'word_count', 'unique_characters', 'is_palindrome'):
+            values = getattr(self, name)
+            setattr(self, name, array(values.typecode, (values[row] for row in live)))
+        self.alive = array('b', [1]) * len(live)
+        self._deleted = 0
@@ -0,0 +1,111 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+from .utils import compute_properties
+
+# Defaults used when the project settings do not override them
+DEFAULT_PARALLEL_THRESHOLD = 1024 * 1024
+DEFAULT_CHUNKS_PER_WORKER = 4
+DEFAULT_ASYNC_OFFLOAD_THRESHOLD = 64 * 1024
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_parallel_threshold():
+    """Input size in characters above which analysis runs on the process pool."""
+    return getattr(settings, 'ANALYZER_PARALLEL_THRESHOLD', DEFAULT_PARALLEL_THRESHOLD)
+
+
+def get_async_offload_threshold():
+    """Input size in characters above which async views analyze off the event loop."""
+    return getattr(settings, 'ANALYZER_ASYNC_OFFLOAD_THRESHOLD', DEFAULT_ASYNC_OFFLOAD_THRESHOLD)
+
+
+def get_max_workers():
+    return getattr(settings, 'ANALYZER_MAX_WORKERS', None) or os.cpu_count() or 1
+
+
+def get_executor():
+    """Return the shared process pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Never fork a (possibly threaded) server process
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            _executor = ProcessPoolExecutor(max_workers=get_max_workers(), mp_context=context)
+        return _executor
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
+
+
+def analyze(value):
+    """Compute properties for a string, on the process pool when it is large."""
+    if len(value) < get_parallel_threshold():
+        return compute_properties(value)
+    return get_executor().submit(compute_properties, value).result()
+
+
+async def analyze_async(value):
+    """Awaitable analyze(): large strings are computed off the event loop.
+
+    Strings past the parallel threshold go to the process pool as usual,
+    medium ones to a thread, and small ones are cheaper to compute inline
+    than to hand off.
+    """
+    if len(value) >= get_parallel_threshold():
+        return await asyncio.wrap_future(get_executor().submit(compute_properties, value))
+    if len(value) >= get_async_offload_threshold():
+        return await asyncio.to_thread(compute_properties, value)
+    return compute_properties(value)
+
+
+def _compute_chunk(values):
+    return [compute_properties(value) for value in values]
+
+
+def analyze_many(values):
+    """Compute properties for many strings, spreading large batches across cores.
+
+    Small batches are analyzed inline since shipping them to worker processes
+    would cost more than the work itself. Results keep the input order.
+    """
+    values = list(values)
+    threshold = get_parallel_threshold()
+    if sum(map(len, values)) < threshold:
+        return _compute_chunk(values)
+
+    # Strings above the threshold get a task of their own, the rest are
+    # grouped into a few chunks per worker
+    executor = get_executor()
+    large = {}
+    small = []
+    for position, value in enumerate(values):
+        if len(value) >= threshold:
+            large[position] = executor.submit(compute_properties, value)
+        else:
+            small.append(position)
+
+    results = [None] * len(values)
+    chunk_count = get_max_workers() * DEFAULT_CHUNKS_PER_WORKER
+    chunk_size = max(1, -(-len(small) // chunk_count))
+    chunks = [small[start:start + chunk_size] for start in range(0, len(small), chunk_size)]
+    computed = executor.map(_compute_chunk, [[values[position] for position in chunk] for chunk in chunks])
+    for chunk, properties in zip(chunks, computed):
+        for position, props in zip(chunk, properties):
+            results[position] = props
+    for position, future in large.items():
+        results[position] = future.result()
+    return results
@@ -0,0 +1,37 @@
+import hashlib
+
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def entry_etag(entry_id):
+    """Strong ETag of a stored string; entries never change, so the hash is enough."""
+    return quote_etag(entry_id)
+
+
+def listing_etag(store, query_params):
+    """Strong ETag of a listing: the store version plus the exact query parameters.
+
+    Returns None when the backend cannot report a version.
+    """
+    version = store.version
+    if version is None:
+        return None
+    params = hashlib.sha256(repr(sorted(query_params.lists())).encode()).hexdigest()[:16]
+    return quote_etag(f'{version}-{params}')
+
+
+def etag_matches(request, etag):
+    """Return whether the request's If-None-Match header matches etag."""
+    if etag is None:
+        return False
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    return etag in etags or '*' in etags
+
+
+def not_modified(request, etag):
+    """Return a 304 response if the request's If-None-Match matches etag, else None."""
+    if etag_matches(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    return None
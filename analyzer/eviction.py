@@ -0,0 +1,151 @@
+"""Capacity limits for the in-memory store: entry count, byte budget and TTL.
+
+A Capacity tracks what the store holds and hands back the next record to
+drop. Entries past their TTL go first, then the eviction policy picks
+victims until the store is back within its limits:
+
+- ``lru`` evicts the entry least recently read through ``store.get``
+  (the detail endpoint); listings do not count as reads
+- ``fifo`` evicts the entry inserted first
+
+Records enter and leave the ordered dicts below once each, so eviction is
+amortized O(1) per insert.
+"""
+import sys
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+POLICIES = ('lru', 'fifo')
+
+# Approximate store memory per entry besides its value and cached JSON: the
+# record, its dict slot and its property and trigram index entries, measured
+# with tracemalloc on word-like corpora
+ENTRY_BYTES = 1500
+INDEX_BYTES_PER_CHAR = 20
+# The cached JSON encoding: keys, id, hash and timestamp, plus about one
+# frequency map item (``"c":n,``) per unique character
+JSON_BYTES = 320
+FREQUENCY_BYTES_PER_CHAR = 8
+
+
+class EntryTooLarge(ValueError):
+    """Raised when a string alone would exceed the store's byte budget."""
+
+
+def footprint(record):
+    """Approximate bytes the store spends on record.
+
+    Counts the value, the index entries it produces and the JSON encoding
+    the record caches once listed, which carries the character frequency
+    map. The encoding is estimated from the value's length and unique
+    characters rather than built, so the figure is the same on insert and
+    removal and sizing a record never caches anything.
+    """
+    return (
+        ENTRY_BYTES + JSON_BYTES + (INDEX_BYTES_PER_CHAR + 1) * len(record.value)
+        + FREQUENCY_BYTES_PER_CHAR * record.unique_characters + sys.getsizeof(record.value)
+    )
+
+
+def now_micros():
+    """Current time in the unit of StringRecord.created."""
+    return time.time_ns() // 1000
+
+
+class Capacity:
+    """Limits on what an InMemoryStringStore may hold; 0 disables a limit.
+
+    Expiry follows insertion order, which is creation order for strings
+    stamped by POST. An entry imported with an older created_at than those
+    before it is dropped from listings once they have expired too, but
+    ``expired`` lets lookups refuse it as soon as its own TTL has passed.
+    """
+
+    def __init__(self, max_entries=0, max_bytes=0, ttl=0, policy='lru'):
+        if policy not in POLICIES:
+            raise ValueError(f'Unknown eviction policy: {policy}')
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.policy = policy
+        self.bytes = 0
+        self.evictions = {'capacity': 0, 'expired': 0}
+        # Eviction order, oldest first; under fifo it is also the expiry order
+        self._order = OrderedDict()
+        self._created = self._order if policy == 'fifo' else OrderedDict()
+
+    @classmethod
+    def from_settings(cls):
+        """Return the Capacity configured in settings, or None when unbounded."""
+        capacity = cls(
+            max_entries=getattr(settings, 'ANALYZER_MAX_ENTRIES', 0),
+            max_bytes=getattr(settings, 'ANALYZER_MAX_BYTES', 0),
+            ttl=getattr(settings, 'ANALYZER_ENTRY_TTL', 0),
+            policy=getattr(settings, 'ANALYZER_EVICTION_POLICY', 'lru'),
+        )
+        return capacity if capacity.bounded else None
+
+    @property
+    def bounded(self):
+        return bool(self.max_entries or self.max_bytes or self.ttl)
+
+    def fits(self, record):
+        """Whether record could be stored at all, even with everything else evicted."""
+        return not self.max_bytes or footprint(record) <= self.max_bytes
+
+    def add(self, record):
+        if self.max_bytes:
+            self.bytes += footprint(record)
+        self._order[record.digest] = record
+        if self.ttl:
+            self._created[record.digest] = record
+
+    def remove(self, record):
+        if self.max_bytes:
+            self.bytes -= footprint(record)
+        self._order.pop(record.digest, None)
+        self._created.pop(record.digest, None)
+
+    def clear(self):
+        self.bytes = 0
+        self._order.clear()
+        self._created.clear()
+
+    def touch(self, record):
+        """Note a read of record, which under lru moves it to the back of the queue."""
+        if self.policy == 'lru':
+            self._order.move_to_end(record.digest)
+
+    def expired(self, record, now):
+        return bool(self.ttl) and record.created <= now - self.ttl * 1000000
+
+    def over_limit(self):
+        return (
+            (self.max_entries and len(self._order) > self.max_entries)
+            or (self.max_bytes and self.bytes > self.max_bytes)
+        )
+
+    def next_victim(self, now):
+        """Return the next record to evict and count it, or None when within limits."""
+        if self._created:
+            record = next(iter(self._created.values()))
+            if self.expired(record, now):
+                self.evictions['expired'] += 1
+                return record
+        if self._order and self.over_limit():
+            self.evictions['capacity'] += 1
+            return next(iter(self._order.values()))
+        return None
+
+    def stats(self):
+        return {
+            'policy': self.policy,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'ttl': self.ttl,
+            'entries': len(self._order),
+            'bytes': self.bytes,
+            'evictions': dict(self.evictions),
+        }
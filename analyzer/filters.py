@@ -0,0 +1,78 @@
+class FilterError(ValueError):
+    """Raised when a listing filter query parameter is invalid."""
+
+
+def parse_int(query_params, name):
+    try:
+        return int(query_params[name])
+    except ValueError:
+        raise FilterError(f'Invalid {name}')
+
+
+def parse_filters(query_params):
+    """Return the listing filters given in query_params, keyed as the stores expect."""
+    filters = {}
+    if 'is_palindrome' in query_params:
+        filters['is_palindrome'] = query_params['is_palindrome'].lower() == 'true'
+    for name in ('min_length', 'max_length', 'word_count'):
+        if name in query_params:
+            filters[name] = parse_int(query_params, name)
+    if 'contains_character' in query_params:
+        char = query_params['contains_character']
+        if len(char) != 1:
+            raise FilterError('contains_character must be a single character')
+        filters['contains_character'] = char
+    if 'contains' in query_params:
+        substring = query_params['contains']
+        if not substring:
+            raise FilterError('contains must not be empty')
+        filters['contains'] = substring
+    return filters
+
+
+# Entry keys and property names a listing can be narrowed to with ?fields=
+ENTRY_FIELDS = ('id', 'value', 'properties', 'created_at')
+PROPERTY_FIELDS = (
+    'length', 'is_palindrome', 'unique_characters', 'word_count', 'sha256_hash', 'character_frequency_map',
+)
+FIELD_PATHS = ENTRY_FIELDS + tuple(f'properties.{name}' for name in PROPERTY_FIELDS)
+
+
+def parse_fields(query_params):
+    """Return the projection asked for with ?fields=, or None for whole entries.
+
+    Fields are comma separated entry keys or ``properties.<name>`` paths. They
+    come back as a tuple in canonical order, so equivalent projections compare
+    equal and share query cache slots.
+    """
+    if 'fields' not in query_params:
+        return None
+    requested = {name.strip() for name in query_params['fields'].split(',') if name.strip()}
+    if not requested:
+        raise FilterError('fields must not be empty')
+    unknown = sorted(requested.difference(FIELD_PATHS))
+    if unknown:
+        raise FilterError(f'Unknown field: {unknown[0]}')
+    if 'properties' in requested:
+        requested = {name for name in requested if not name.startswith('properties.')}
+    return tuple(name for name in FIELD_PATHS if name in requested)
+
+
+def wants_frequency_map(fields):
+    """Whether a projection includes the character frequency map, the costliest field."""
+    return fields is None or 'properties' in fields or 'properties.character_frequency_map' in fields
+
+
+def project_entry(entry, fields):
+    """Return entry narrowed to the fields from parse_fields (all of it for None)."""
+    if fields is None:
+        return entry
+    projected = {}
+    for name in ENTRY_FIELDS:
+        if name in fields:
+            projected[name] = entry[name]
+        elif name == 'properties':
+            properties = {key: entry[name][key] for key in PROPERTY_FIELDS if f'properties.{key}' in fields}
+            if properties:
+                projected[name] = properties
+    return projected
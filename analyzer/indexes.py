@@ -0,0 +1,155 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+
+# Substring search can use an inverted index of character trigrams
+NGRAM_SIZE = 3
+# Longer values are not split into n-grams; they are always verified directly
+MAX_NGRAM_INDEXED_LENGTH = 10000
+
+
+def ngrams(value, size=NGRAM_SIZE):
+    return {value[start:start + size] for start in range(len(value) - size + 1)}
+
+
+class PropertyIndex:
+    """Secondary indexes over stored StringRecords, keyed by record digest.
+
+    ``records`` is the store's digest to record mapping, used to check the
+    length of candidates that came from another index.
+
+    The trigram index behind ``contains`` is opt-in (``ngrams=True``): it
+    costs a set of trigrams per value on every insert and log replay.
+    Without it substring candidates come from the character index and are
+    verified against their values, as long values always are.
+    """
+
+    def __init__(self, records, ngrams=False):
+        self._records = records
+        self.ngrams = ngrams
+        self._lengths = []  # sorted distinct lengths, bisected for range queries
+        self._length_buckets = {}
+        self._word_counts = defaultdict(set)
+        self._palindromes = {True: set(), False: set()}
+        self._characters = defaultdict(set)
+        self._ngrams = defaultdict(set)
+        self._unindexed = set()
+
+    def add(self, record):
+        key = record.digest
+        length = record.length
+        if length not in self._length_buckets:
+            insort(self._lengths, length)
+            self._length_buckets[length] = set()
+        self._length_buckets[length].add(key)
+        self._word_counts[record.word_count].add(key)
+        self._palindromes[record.is_palindrome].add(key)
+        for char in set(record.value):
+            self._characters[char].add(key)
+        if not self.ngrams:
+            return
+        if length > MAX_NGRAM_INDEXED_LENGTH:
+            self._unindexed.add(key)
+        else:
+            for gram in ngrams(record.value):
+                self._ngrams[gram].add(key)
+
+    def remove(self, record):
+        key = record.digest
+        length = record.length
+        bucket = self._length_buckets[length]
+        bucket.discard(key)
+        if not bucket:
+            del self._length_buckets[length]
+            del self._lengths[bisect_left(self._lengths, length)]
+        _discard(self._word_counts, record.word_count, key)
+        self._palindromes[record.is_palindrome].discard(key)
+        for char in set(record.value):
+            _discard(self._characters, char, key)
+        if not self.ngrams:
+            return
+        if length > MAX_NGRAM_INDEXED_LENGTH:
+            self._unindexed.discard(key)
+        else:
+            for gram in ngrams(record.value):
+                _discard(self._ngrams, gram, key)
+
+    def clear(self):
+        self.__init__(self._records, self.ngrams)
+
+    def select(self, filters):
+        """Return the set of digests matching filters, or None if no indexed filter applies.
+
+        Candidate sets are ordered by size and intersected starting from the
+        most selective one, so the work is bounded by the smallest match set.
+        A ``contains`` substring narrows candidates through the n-gram (or
+        character) index and the survivors are then checked against their values.
+        """
+        sources = []
+        if 'min_length' in filters or 'max_length' in filters:
+            low = filters.get('min_length')
+            high = filters.get('max_length')
+            start = 0 if low is None else bisect_left(self._lengths, low)
+            end = len(self._lengths) if high is None else bisect_right(self._lengths, high)
+            buckets = [self._length_buckets[length] for length in self._lengths[start:end]]
+            sources.append((sum(map(len, buckets)), 'length', (buckets, low, high)))
+        if 'word_count' in filters:
+            ids = self._word_counts.get(filters['word_count'], set())
+            sources.append((len(ids), 'set', ids))
+        if 'is_palindrome' in filters:
+            ids = self._palindromes[filters['is_palindrome']]
+            sources.append((len(ids), 'set', ids))
+        if 'contains_character' in filters:
+            ids = self._characters.get(filters['contains_character'], set())
+            sources.append((len(ids), 'set', ids))
+        if 'contains' in filters:
+            ids = self._substring_candidates(filters['contains'])
+            sources.append((len(ids), 'set', ids))
+        if not sources:
+            return None
+
+        sources.sort(key=lambda source: source[0])
+        size, kind, payload = sources[0]
+        if kind == 'length':
+            result = set().union(*payload[0])
+        else:
+            result = set(payload)
+
+        for size, kind, payload in sources[1:]:
+            if not result:
+                break
+            if kind == 'length':
+                low, high = payload[1:]
+                records = self._records
+                result = {
+                    key for key in result
+                    if (low is None or records[key].length >= low)
+                    and (high is None or records[key].length <= high)
+                }
+            else:
+                result &= payload
+
+        if 'contains' in filters:
+            substring = filters['contains']
+            records = self._records
+            result = {key for key in result if substring in records[key].value}
+        return result
+
+    def _substring_candidates(self, substring):
+        """Return a superset of the keys whose value contains substring."""
+        if self.ngrams and len(substring) >= NGRAM_SIZE:
+            buckets, unindexed = self._ngrams, self._unindexed
+            keys = ngrams(substring)
+        else:
+            # No trigrams to go on; every value containing it has all its characters
+            buckets, unindexed = self._characters, set()
+            keys = set(substring)
+        sets = sorted((buckets.get(key, set()) for key in keys), key=len)
+        return set(sets[0]).intersection(*sets[1:]) | unindexed
+
+
+def _discard(buckets, bucket_key, key):
+    keys = buckets.get(bucket_key)
+    if keys is not None:
+        keys.discard(key)
+        if not keys:
+            del buckets[bucket_key]
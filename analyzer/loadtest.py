@@ -0,0 +1,174 @@
+"""Concurrent HTTP load generator for comparing WSGI and ASGI deployments.
+
+Each simulated client holds one keep-alive connection open and sends
+requests back to back for the whole run, so thousands of clients mean
+thousands of concurrent connections. Start the servers to compare, e.g.
+
+    gunicorn HNG2.wsgi -w 4 -b 127.0.0.1:8001
+    gunicorn HNG2.asgi -k uvicorn.workers.UvicornWorker -w 4 -b 127.0.0.1:8002
+
+and point the tool at both:
+
+    python -m analyzer.loadtest --connections 2000 --duration 30 \\
+        --target wsgi=http://127.0.0.1:8001 --target asgi=http://127.0.0.1:8002
+
+Only the standard library is used, so it runs from any checkout.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import urlsplit
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+DEFAULT_PATH = '/strings?limit=20'
+CREATE_PATH = '/strings'
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+
+    def record(self, status, latency):
+        self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def summary(self, elapsed):
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000, 2)
+
+        return {
+            'requests': len(latencies),
+            'errors': self.errors,
+            'requests_per_second': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items())},
+        }
+
+
+def build_request(host, method, path, body=b''):
+    head = f'{method} {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n'
+    if body:
+        head += f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n'
+    return head.encode() + b'\r\n' + body
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response; return (status, keep_alive)."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif status not in (204, 304):
+        await reader.read()
+        return status, False
+    return status, headers.get('connection', '').lower() != 'close'
+
+
+async def client(number, url, deadline, post_ratio, stats):
+    parts = urlsplit(url)
+    host = parts.hostname
+    port = parts.port or 80
+    if parts.path in ('', '/'):
+        path = DEFAULT_PATH
+    else:
+        path = parts.path + ('?' + parts.query if parts.query else '')
+
+    rng = random.Random(number)
+    writer = None
+    sent = 0
+    while time.monotonic() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            if rng.random() < post_ratio:
+                body = json.dumps({'value': f'load test {number} {sent} {rng.random()}'}).encode()
+                request = build_request(host, 'POST', CREATE_PATH, body)
+            else:
+                request = build_request(host, 'GET', path)
+            started = time.monotonic()
+            writer.write(request)
+            await writer.drain()
+            status, keep_alive = await read_response(reader)
+            stats.record(status, time.monotonic() - started)
+            sent += 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            stats.errors += 1
+            if writer is not None:
+                writer.close()
+                writer = None
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(url, connections, duration, post_ratio=0.0):
+    """Hammer url with `connections` concurrent clients for duration seconds."""
+    stats = Stats()
+    started = time.monotonic()
+    deadline = started + duration
+    await asyncio.gather(*(client(number, url, deadline, post_ratio, stats) for number in range(connections)))
+    return stats.summary(time.monotonic() - started)
+
+
+def raise_open_file_limit():
+    """Allow as many sockets as the hard limit permits."""
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard != resource.RLIM_INFINITY and soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--target', action='append', required=True, metavar='NAME=URL',
+                        help=f'server to load; a bare host URL is tested on {DEFAULT_PATH}')
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--post-ratio', type=float, default=0.0,
+                        help='fraction of requests that POST a new string')
+    args = parser.parse_args(argv)
+
+    raise_open_file_limit()
+    results = {}
+    for target in args.target:
+        name, _, url = target.partition('=')
+        if not url or '://' in name:
+            name = url = target
+        results[name] = asyncio.run(run_load(url, args.connections, args.duration, args.post_ratio))
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analyzer import apibench
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the analyzer API on a synthetic corpus and print JSON results '
+        '(throughput and p50/p95/p99 latency per endpoint) that can be diffed between commits.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=('client', 'gunicorn'), default='client',
+                            help='in-process Django test client, or a gunicorn server started for the run')
+        parser.add_argument('--corpus-size', type=int, default=10000)
+        parser.add_argument('--requests', type=int, default=1000, help='requests per scenario')
+        parser.add_argument('--scenario', action='append', choices=apibench.SCENARIOS, dest='scenarios',
+                            help='scenario to run, repeatable (default: all, in order)')
+        parser.add_argument('--distribution', choices=apibench.DISTRIBUTIONS, default='lognormal',
+                            help='string length distribution of the corpus')
+        parser.add_argument('--min-length', type=int, default=1)
+        parser.add_argument('--max-length', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--workers', type=int, default=1, help='gunicorn worker processes')
+        parser.add_argument('--threads', type=int, default=1, help='gunicorn threads per worker')
+        parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+        parser.add_argument('--baseline', help='earlier JSON report to compare against')
+
+    def handle(self, *args, **options):
+        if options['min_length'] < 1 or options['max_length'] < options['min_length']:
+            raise CommandError('Lengths must satisfy 1 <= --min-length <= --max-length')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as handle:
+                baseline = json.load(handle)
+
+        try:
+            report = apibench.run_benchmark(
+                target=options['target'],
+                corpus_size=options['corpus_size'],
+                requests=options['requests'],
+                scenarios=options['scenarios'] or apibench.SCENARIOS,
+                distribution=options['distribution'],
+                min_length=options['min_length'],
+                max_length=options['max_length'],
+                seed=options['seed'],
+                workers=options['workers'],
+                threads=options['threads'],
+            )
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+        if baseline is not None:
+            report['baseline_comparison'] = apibench.compare(report, baseline)
+
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+        else:
+            self.stdout.write(output)
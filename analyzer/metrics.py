@@ -0,0 +1,181 @@
+"""Request latency and per-phase timing, rendered in the Prometheus text format.
+
+MetricsMiddleware times every request and opens a phase record for it;
+``timed(phase)`` blocks inside the views and utils add their own elapsed
+time, less that of phases nested in them, to that record. When the request
+finishes each phase total is observed once, labelled with the endpoint, so
+the histograms show where a request spends its time. Outside a request
+``timed`` only costs a context variable lookup.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+
+# Upper bounds in seconds, Prometheus' client defaults plus finer low buckets
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Phase name to seconds spent in it during the current request
+_phases = ContextVar('analyzer_phases', default=None)
+# The innermost timed block still running, which nested blocks report to
+_open_phase = ContextVar('analyzer_open_phase', default=None)
+
+
+class Histogram:
+    """Cumulative bucket counts with a running sum, as Prometheus expects."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Request counters and latency histograms for the whole process."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._requests = {}
+        self._latency = {}
+        self._phases = {}
+        self._lock = threading.Lock()
+
+    def observe_request(self, endpoint, method, status, seconds, phases=None):
+        with self._lock:
+            key = (endpoint, method, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+            self._histogram(self._latency, (endpoint, method)).observe(seconds)
+            for phase, spent in (phases or {}).items():
+                self._histogram(self._phases, (endpoint, phase)).observe(spent)
+
+    def clear(self):
+        with self._lock:
+            self._requests.clear()
+            self._latency.clear()
+            self._phases.clear()
+
+    def render(self, gauges=()):
+        """Return the metrics in the Prometheus text exposition format.
+
+        ``gauges`` adds (name, help, value) samples computed by the caller.
+        """
+        lines = []
+        with self._lock:
+            lines += _header('analyzer_requests_total', 'counter', 'Requests served by endpoint, method and status.')
+            for (endpoint, method, status), count in sorted(self._requests.items()):
+                lines.append(f'analyzer_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}')
+            lines += self._render_histograms(
+                'analyzer_request_duration_seconds', 'Request latency by endpoint and method.',
+                self._latency, ('endpoint', 'method'),
+            )
+            lines += self._render_histograms(
+                'analyzer_phase_duration_seconds', 'Time spent per request in each phase of the handler.',
+                self._phases, ('endpoint', 'phase'),
+            )
+        for name, help_text, value in gauges:
+            lines += _header(name, 'gauge', help_text)
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def _histogram(self, histograms, key):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram(self.buckets)
+        return histogram
+
+    def _render_histograms(self, name, help_text, histograms, label_names):
+        lines = _header(name, 'histogram', help_text)
+        for key, histogram in sorted(histograms.items()):
+            labels = dict(zip(label_names, key))
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(**labels, le=bound)} {cumulative}')
+            lines.append(f'{name}_sum{_labels(**labels)} {histogram.sum}')
+            lines.append(f'{name}_count{_labels(**labels)} {histogram.count}')
+        return lines
+
+
+def _header(name, kind, help_text):
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def start_phases():
+    """Begin collecting phase timings for the current request; returns a reset token."""
+    return _phases.set({})
+
+
+def finish_phases(token):
+    """Stop collecting and return the phase timings gathered since start_phases."""
+    phases = _phases.get()
+    _phases.reset(token)
+    return phases
+
+
+def add_phase(phase, seconds):
+    phases = _phases.get()
+    if phases is not None:
+        phases[phase] = phases.get(phase, 0.0) + seconds
+
+
+class timed:
+    """Add the time spent in a block (or decorated function) to a request phase.
+
+    Phases nest (``hash`` runs inside ``compute_properties`` inside
+    ``analyze``) but never overlap in the totals: a block's time spent in
+    nested phases is counted only there, so a request's phases add up to at
+    most its latency.
+    """
+
+    def __init__(self, phase):
+        self.phase = phase
+        self._started = None
+
+    def __call__(self, func):
+        phase = self.phase
+
+        @wraps(func)
+        def inner(*args, **kwargs):
+            if _phases.get() is None:
+                # Not inside a request (or in a worker process): skip the clock
+                return func(*args, **kwargs)
+            with timed(phase):
+                return func(*args, **kwargs)
+        return inner
+
+    def __enter__(self):
+        if _phases.get() is not None:
+            self._nested = 0.0
+            self._token = _open_phase.set(self)
+            self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._started is not None:
+            elapsed = time.perf_counter() - self._started
+            _open_phase.reset(self._token)
+            parent = _open_phase.get()
+            if parent is not None:
+                parent._nested += elapsed
+            add_phase(self.phase, elapsed - self._nested)
+        return False
+
+
+# Shared by the middleware and the /metrics view
+registry = MetricsRegistry()
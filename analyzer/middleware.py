@@ -0,0 +1,97 @@
+import cProfile
+import itertools
+import os
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import finish_phases, registry, start_phases
+
+
+class MetricsMiddleware:
+    """Record latency and phase timings of every request in metrics.registry.
+
+    With ANALYZER_PROFILE_EVERY set to N, one request in N also runs under
+    cProfile and its stats are dumped to ANALYZER_PROFILE_DIR as
+    ``<endpoint>-<time>-<pid>-<n>.prof`` for offline analysis (e.g. with
+    pstats or snakeviz). Only one request is profiled at a time; under ASGI the
+    profile also catches whatever else the event loop ran meanwhile.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.profile_every = getattr(settings, 'ANALYZER_PROFILE_EVERY', 0)
+        self.profile_dir = getattr(settings, 'ANALYZER_PROFILE_DIR', None)
+        self._requests = itertools.count(1)
+        self._dumps = itertools.count(1)
+        self._profiling = threading.Lock()
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        token = start_phases()
+        profiler = self._start_profiler()
+        try:
+            response = self.get_response(request)
+        finally:
+            self._stop_profiler(profiler, request)
+        self._record(request, response, started, finish_phases(token))
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        token = start_phases()
+        profiler = self._start_profiler()
+        try:
+            response = await self.get_response(request)
+        finally:
+            self._stop_profiler(profiler, request)
+        self._record(request, response, started, finish_phases(token))
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook returns
+        request._metrics_render_started = time.perf_counter()
+        return response
+
+    def _record(self, request, response, started, phases):
+        finished = time.perf_counter()
+        render_started = getattr(request, '_metrics_render_started', None)
+        if render_started is not None:
+            phases['render'] = finished - render_started
+        registry.observe_request(_endpoint(request), request.method, response.status_code, finished - started, phases)
+
+    def _start_profiler(self):
+        if not self.profile_every or next(self._requests) % self.profile_every:
+            return None
+        if not self._profiling.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _stop_profiler(self, profiler, request):
+        if profiler is None:
+            return
+        profiler.disable()
+        self._profiling.release()
+        os.makedirs(self.profile_dir, exist_ok=True)
+        name = f'{_endpoint(request)}-{time.strftime("%Y%m%dT%H%M%S")}-{os.getpid()}-{next(self._dumps)}.prof'
+        profiler.dump_stats(os.path.join(self.profile_dir, name))
+
+
+def _endpoint(request):
+    """Label requests by URL pattern name rather than raw path to bound cardinality."""
+    match = request.resolver_match
+    if match is None:
+        return 'unmatched'
+    return match.url_name or match.view_name
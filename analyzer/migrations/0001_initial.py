@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:31
+
+from django.db import migrations, models
+
+
+def create_store_version(apps, schema_editor):
+    StoreVersion = apps.get_model('analyzer', 'StoreVersion')
+    StoreVersion.objects.using(schema_editor.connection.alias).create(pk=1, value=0)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoreVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AnalyzedString',
+            fields=[
+                ('id', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('seq', models.BigIntegerField(unique=True)),
+                ('value', models.TextField()),
+                ('length', models.PositiveIntegerField(db_index=True)),
+                ('is_palindrome', models.BooleanField(db_index=True)),
+                ('unique_characters', models.PositiveIntegerField(db_index=True)),
+                ('word_count', models.PositiveIntegerField(db_index=True)),
+                ('character_frequency_map', models.JSONField()),
+                ('created_at', models.CharField(max_length=32)),
+            ],
+            options={
+                'ordering': ['seq'],
+                'indexes': [models.Index(fields=['is_palindrome', 'word_count', 'length'], name='analyzer_pal_words_len_idx'), models.Index(fields=['word_count', 'length'], name='analyzer_words_len_idx')],
+            },
+        ),
+        migrations.RunPython(create_store_version, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,68 @@
 from django.db import models
 
-# Create your models here.
+
+class AnalyzedString(models.Model):
+    """An analyzed string, with its scalar properties as indexed columns."""
+
+    id = models.CharField(primary_key=True, max_length=64)
+    seq = models.BigIntegerField(unique=True)
+    value = models.TextField()
+    length = models.PositiveIntegerField(db_index=True)
+    is_palindrome = models.BooleanField(db_index=True)
+    unique_characters = models.PositiveIntegerField(db_index=True)
+    word_count = models.PositiveIntegerField(db_index=True)
+    character_frequency_map = models.JSONField()
+    created_at = models.CharField(max_length=32)
+
+    class Meta:
+        ordering = ['seq']
+        indexes = [
+            models.Index(fields=['is_palindrome', 'word_count', 'length'], name='analyzer_pal_words_len_idx'),
+            models.Index(fields=['word_count', 'length'], name='analyzer_words_len_idx'),
+        ]
+
+    def __str__(self):
+        return self.value
+
+    @classmethod
+    def from_entry(cls, entry, seq):
+        props = entry['properties']
+        return cls(
+            id=entry['id'],
+            seq=seq,
+            value=entry['value'],
+            length=props['length'],
+            is_palindrome=props['is_palindrome'],
+            unique_characters=props['unique_characters'],
+            word_count=props['word_count'],
+            character_frequency_map=props['character_frequency_map'],
+            created_at=entry['created_at'],
+        )
+
+    def to_entry(self, frequency_map=True):
+        properties = {
+            'length': self.length,
+            'is_palindrome': self.is_palindrome,
+            'unique_characters': self.unique_characters,
+            'word_count': self.word_count,
+            'sha256_hash': self.id,
+        }
+        # Leave the map out when it was deferred, or reading it costs a query per row
+        if frequency_map:
+            properties['character_frequency_map'] = self.character_frequency_map
+        return {
+            'id': self.id,
+            'value': self.value,
+            'properties': properties,
+            'created_at': self.created_at,
+        }
+
+
+class StoreVersion(models.Model):
+    """Single-row counter bumped by every insert and delete of an AnalyzedString.
+
+    New strings take the bumped value as their sequence number, so sequence
+    numbers only grow and are never reused after a delete.
+    """
+
+    value = models.BigIntegerField(default=0)
@@ -0,0 +1,147 @@
+"""Compile natural language queries into listing filters.
+
+A query is tokenized against a fixed set of precompiled clause patterns into
+a small AST of ``Clause`` nodes, which are then folded into the same filter
+dict GET /strings builds from its query parameters. Parsed queries are cached
+by their normalized text. Keywords match case-insensitively, but quoted
+substrings keep their case since ``contains`` searches are case-sensitive.
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# One recognized phrase: the filter it sets, the value and the matched text
+Clause = namedtuple('Clause', ['field', 'value', 'text'])
+
+NUMBER_WORDS = {
+    'single': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10,
+}
+VOWELS = 'aeiou'
+
+# Clause patterns in priority order; at any position the first one that
+# matches wins, so negated forms must come before their positive forms
+_PATTERNS = [
+    ('assignment', r'\b(?P<field>is_palindrome|min_length|max_length|word_count|contains_character|contains)\s*=\s*(?P<value>[^\s,&]+)'),
+    ('not_palindrome', r'\b(?:non-?|not\s+)palindrom(?:ic|es?)\b'),
+    ('palindrome', r'\bpalindrom(?:ic|es?)\b'),
+    ('word_count', r'\b(?P<count>\d+|' + '|'.join(NUMBER_WORDS) + r')[\s-]words?\b'),
+    ('longer', r'\blonger than (?P<length>\d+)(?: characters?)?'),
+    ('shorter', r'\bshorter than (?P<length>\d+)(?: characters?)?'),
+    ('at_least', r'\bat least (?P<length>\d+) characters?'),
+    ('at_most', r'\bat most (?P<length>\d+) characters?'),
+    ('vowel', r'\bcontain(?:s|ing)? the (?P<ordinal>first|second|third|fourth|fifth|last) vowel\b'),
+    ('quoted', r'\bcontain(?:s|ing)? (?:the (?:substring|text|word) )?(?P<quote>[\'"])(?P<text>.+?)(?P=quote)'),
+    ('substring', r'\bcontain(?:s|ing)? the (?:substring|text|word) (?P<text>[^\s\'"]+)'),
+    ('letter', r'\bcontain(?:s|ing)? (?:the )?(?:letter|character) [\'"]?(?P<char>[^\s\'"])[\'"]?'),
+]
+
+
+def _prefix_groups(name, pattern):
+    # Inner groups are prefixed with their clause name to keep them unique
+    return pattern.replace('(?P<', f'(?P<{name}__').replace('(?P=', f'(?P={name}__')
+
+
+_TOKENIZER = re.compile(
+    '|'.join(f'(?P<{name}>{_prefix_groups(name, pattern)})' for name, pattern in _PATTERNS),
+    re.IGNORECASE,
+)
+_WHITESPACE = re.compile(r'\s+')
+_ORDINALS = {'first': 0, 'second': 1, 'third': 2, 'fourth': 3, 'fifth': 4, 'last': -1}
+
+
+class QueryError(ValueError):
+    """Raised when a query cannot be turned into valid filters."""
+
+
+class QueryConflictError(QueryError):
+    """Raised when a query asks for filters that can never match together."""
+
+
+def normalize(query):
+    return _WHITESPACE.sub(' ', query.strip())
+
+
+def tokenize(query):
+    """Return the Clause nodes recognized in an already normalized query."""
+    clauses = []
+    for match in _TOKENIZER.finditer(query):
+        kind = match.lastgroup
+        prefix = kind + '__'
+        groups = {
+            key[len(prefix):]: value for key, value in match.groupdict().items()
+            if value is not None and key.startswith(prefix)
+        }
+        clauses.append(_CLAUSE_BUILDERS[kind](groups, match.group(kind)))
+    return clauses
+
+
+def _assignment(groups, text):
+    field, value = groups['field'].lower(), groups['value']
+    if field == 'is_palindrome':
+        return Clause(field, value.lower() == 'true', text)
+    if field == 'contains_character':
+        if len(value) != 1:
+            raise QueryError('contains_character must be a single character')
+        return Clause(field, value.lower(), text)
+    if field == 'contains':
+        return Clause(field, value, text)
+    try:
+        return Clause(field, int(value), text)
+    except ValueError:
+        raise QueryError(f'Invalid {field}')
+
+
+def _word_count(groups, text):
+    count = groups['count'].lower()
+    return Clause('word_count', int(count) if count.isdigit() else NUMBER_WORDS[count], text)
+
+
+_CLAUSE_BUILDERS = {
+    'assignment': _assignment,
+    'not_palindrome': lambda groups, text: Clause('is_palindrome', False, text),
+    'palindrome': lambda groups, text: Clause('is_palindrome', True, text),
+    'word_count': _word_count,
+    'longer': lambda groups, text: Clause('min_length', int(groups['length']) + 1, text),
+    'shorter': lambda groups, text: Clause('max_length', int(groups['length']) - 1, text),
+    'at_least': lambda groups, text: Clause('min_length', int(groups['length']), text),
+    'at_most': lambda groups, text: Clause('max_length', int(groups['length']), text),
+    'vowel': lambda groups, text: Clause('contains_character', VOWELS[_ORDINALS[groups['ordinal'].lower()]], text),
+    'quoted': lambda groups, text: Clause('contains', groups['text'], text),
+    'substring': lambda groups, text: Clause('contains', groups['text'], text),
+    'letter': lambda groups, text: Clause('contains_character', groups['char'].lower(), text),
+}
+
+
+def compile_clauses(clauses):
+    """Fold clauses into a filter dict, raising QueryConflictError on contradictions.
+
+    Repeated length bounds are narrowed to the strictest one; any other
+    field given two different values is a conflict.
+    """
+    filters = {}
+    for clause in clauses:
+        field, value = clause.field, clause.value
+        if field not in filters:
+            filters[field] = value
+        elif field == 'min_length':
+            filters[field] = max(filters[field], value)
+        elif field == 'max_length':
+            filters[field] = min(filters[field], value)
+        elif field == 'contains' and filters[field] != value:
+            raise QueryError('Only one substring can be searched for per query')
+        elif filters[field] != value:
+            raise QueryConflictError(f'Query has conflicting values for {field}')
+    if filters.get('min_length', 0) > filters.get('max_length', float('inf')):
+        raise QueryConflictError('Query has conflicting length bounds')
+    return filters
+
+
+@lru_cache(maxsize=1024)
+def _parse_normalized(query):
+    return tuple(compile_clauses(tokenize(query)).items())
+
+
+def parse_query(query):
+    """Return the filters for a natural language query."""
+    return dict(_parse_normalized(normalize(query)))
@@ -0,0 +1,105 @@
+import base64
+import binascii
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .utils import encode_json
+
+
+class PaginationError(ValueError):
+    """Raised when the cursor or limit query parameters are invalid."""
+
+
+def encode_cursor(seq):
+    return base64.urlsafe_b64encode(str(seq).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise PaginationError('Invalid cursor')
+
+
+def parse_page_params(query_params):
+    """Return (after, limit) from the cursor and limit query parameters."""
+    after = None
+    limit = None
+    if 'cursor' in query_params:
+        after = decode_cursor(query_params['cursor'])
+    if 'limit' in query_params:
+        try:
+            limit = int(query_params['limit'])
+        except ValueError:
+            raise PaginationError('Invalid limit')
+        if limit < 1:
+            raise PaginationError('limit must be a positive integer')
+    return after, limit
+
+
+def wants_stream(query_params):
+    return query_params.get('stream', '').lower() in ('1', 'true')
+
+
+def next_cursor(page):
+    """Return the cursor for the page after a storage Page, or None on the last page."""
+    return None if page.next_seq is None else encode_cursor(page.next_seq)
+
+
+def _head(fields):
+    """Open a listing object: the fields given, then the start of the data array."""
+    head = encode_json(fields)
+    return head[:-1] + (b',' if fields else b'') + b'"data":['
+
+
+def encode_listing(entries, **fields):
+    """Build a listing body, data first, from entries already encoded as JSON bytes."""
+    tail = encode_json(fields)[1:]
+    return b'{"data":[' + b','.join(entries) + (b'],' if fields else b']') + tail
+
+
+def stream_listing(entries, **fields):
+    """Stream a listing of JSON-encoded entries as one JSON object."""
+    def generate():
+        yield _head(fields)
+        for position, entry in enumerate(entries):
+            yield (b',' if position else b'') + entry
+        yield b']}'
+
+    return StreamingHttpResponse(generate(), content_type='application/json')
+
+
+class PreEncodedResponse(Response):
+    """DRF Response whose body is already encoded as JSON.
+
+    When content negotiation picks the plain JSON renderer the bytes are sent
+    as they are; other renderers, such as the browsable API, and ``.data``
+    see them decoded.
+    """
+
+    def __init__(self, content, **kwargs):
+        super().__init__(None, **kwargs)
+        self.content_bytes = content
+
+    @property
+    def data(self):
+        return json.loads(self.content_bytes)
+
+    @data.setter
+    def data(self, value):
+        # Response.__init__ assigns the data it was given; the bytes are the data
+        pass
+
+    @property
+    def rendered_content(self):
+        renderer = getattr(self, 'accepted_renderer', None)
+        if type(renderer) is JSONRenderer and renderer.compact and not renderer.ensure_ascii:
+            # The bytes are compact and unescaped; anything else is rendered as usual
+            if renderer.get_indent(self.accepted_media_type, self.renderer_context or {}) is None:
+                self['Content-Type'] = renderer.media_type
+                return self.content_bytes
+        return super().rendered_content
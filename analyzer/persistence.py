@@ -0,0 +1,167 @@
+import json
+import os
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+from .records import StringRecord
+
+FSYNC_ALWAYS = 'always'
+FSYNC_BATCH = 'batch'
+FSYNC_OFF = 'off'
+FSYNC_POLICIES = (FSYNC_ALWAYS, FSYNC_BATCH, FSYNC_OFF)
+
+
+class DataDirLocked(RuntimeError):
+    """Raised when another process already writes to the log's directory."""
+
+
+def _dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+
+class AppendOnlyLog:
+    """Durable storage for the string store: a snapshot plus an append-only log.
+
+    Records are written in their flat row form, without the character
+    frequency map, which is cheaper to recount than to decode.
+
+    Every create and delete is appended to the log as one JSON line. Once the
+    log holds ``snapshot_every`` records the store writes a compacted snapshot
+    of its live entries and the log starts over, so startup only has to load
+    the latest snapshot and replay a short tail.
+
+    ``fsync`` controls durability: ``always`` syncs every record, ``batch``
+    syncs every ``batch_size`` records and ``off`` leaves it to the OS.
+
+    One process owns a directory at a time: the log takes an exclusive lock
+    on it when created and fails fast if another worker holds it, since
+    interleaved appends and snapshots would corrupt each other.
+    """
+
+    def __init__(self, directory, fsync=FSYNC_BATCH, batch_size=100, snapshot_every=100000):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f'Unknown fsync policy {fsync!r}, expected one of {FSYNC_POLICIES}')
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.log_path = self.directory / 'strings.log'
+        self.snapshot_path = self.directory / 'strings.snapshot'
+        self.fsync = fsync
+        self.batch_size = batch_size
+        self.snapshot_every = snapshot_every
+        self.records_since_snapshot = 0
+        self._unsynced = 0
+        self._file = None
+        self._lock_file = None
+        self._lock()
+
+    def load(self):
+        """Return the persisted StringRecords, keyed by hex id in insertion order."""
+        records = {}
+        if self.snapshot_path.exists():
+            with open(self.snapshot_path, encoding='utf-8') as snapshot:
+                for line in snapshot:
+                    row = json.loads(line)
+                    records[row[0]] = row
+
+        self.records_since_snapshot = 0
+        if self.log_path.exists():
+            intact = 0
+            with open(self.log_path, 'rb') as log:
+                for line in log:
+                    try:
+                        # Every record is written with its newline, so one without it is torn too
+                        if not line.endswith(b'\n'):
+                            raise ValueError('Missing newline')
+                        change = json.loads(line)
+                    except ValueError:
+                        # A torn write at the tail of the log; everything before it is intact
+                        break
+                    # Replay is idempotent so a crash between writing a snapshot
+                    # and truncating the log loses nothing
+                    if change['op'] == 'create':
+                        records.setdefault(change['row'][0], change['row'])
+                    else:
+                        records.pop(change['id'], None)
+                    self.records_since_snapshot += 1
+                    intact += len(line)
+            if intact < self.log_path.stat().st_size:
+                # Cut the torn tail off, or new records appended after it would be lost with it
+                os.truncate(self.log_path, intact)
+        return {entry_id: StringRecord.from_row(row) for entry_id, row in records.items()}
+
+    def append_create(self, record):
+        self._append({'op': 'create', 'row': record.to_row()})
+
+    def append_delete(self, entry_id):
+        self._append({'op': 'delete', 'id': entry_id})
+
+    def needs_snapshot(self):
+        return self.records_since_snapshot >= self.snapshot_every
+
+    def snapshot(self, records):
+        """Atomically replace the snapshot with records and truncate the log."""
+        if self._lock_file is None:
+            self._lock()
+        temporary = self.snapshot_path.with_name(self.snapshot_path.name + '.tmp')
+        with open(temporary, 'w', encoding='utf-8') as snapshot:
+            for record in records:
+                snapshot.write(_dumps(record.to_row()) + '\n')
+            snapshot.flush()
+            if self.fsync != FSYNC_OFF:
+                os.fsync(snapshot.fileno())
+        os.replace(temporary, self.snapshot_path)
+
+        self._close_file()
+        self._file = open(self.log_path, 'w', encoding='utf-8')
+        self.records_since_snapshot = 0
+
+    def sync(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def close(self):
+        """Flush and close the log and give up the lock on its directory."""
+        self._close_file()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _lock(self):
+        self._lock_file = open(self.directory / 'strings.lock', 'a')
+        if fcntl is None:
+            return
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            self._lock_file = None
+            raise DataDirLocked(
+                f'{self.directory} is in use by another process; give each worker its own '
+                'ANALYZER_DATA_DIR or share data with the database backend'
+            )
+
+    def _close_file(self):
+        if self._file is not None:
+            if self.fsync != FSYNC_OFF:
+                self.sync()
+            self._file.close()
+            self._file = None
+
+    def _append(self, record):
+        if self._lock_file is None:
+            self._lock()
+        if self._file is None:
+            self._file = open(self.log_path, 'a', encoding='utf-8')
+        self._file.write(_dumps(record) + '\n')
+        self.records_since_snapshot += 1
+        self._unsynced += 1
+        if self.fsync == FSYNC_ALWAYS or (self.fsync == FSYNC_BATCH and self._unsynced >= self.batch_size):
+            self.sync()
+        else:
+            self._file.flush()
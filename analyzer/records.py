@@ -0,0 +1,132 @@
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from .filters import project_entry, wants_frequency_map
+from .utils import encode_json
+
+EPOCH = datetime(1970, 1, 1)
+
+# Bit layout of StringRecord.packed, from least significant:
+# is_palindrome (1 bit), unique_characters (21 bits, enough for every code
+# point), word_count (42 bits), then length
+_UNIQUE_SHIFT = 1
+_WORDS_SHIFT = 22
+_LENGTH_SHIFT = 64
+_UNIQUE_MASK = (1 << 21) - 1
+_WORDS_MASK = (1 << 42) - 1
+
+
+def timestamp_to_micros(created_at):
+    """Convert an ISO 8601 created_at string to integer microseconds since the epoch."""
+    moment = datetime.fromisoformat(created_at)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return (moment - EPOCH) // timedelta(microseconds=1)
+
+
+def micros_to_timestamp(micros):
+    """Format microseconds since the epoch the way POST /strings stamps created_at."""
+    return (EPOCH + timedelta(microseconds=micros)).isoformat() + 'Z'
+
+
+class StringRecord:
+    """Compact in-memory form of a stored string.
+
+    Holds the raw 32-byte digest instead of its hex form, created_at as
+    integer microseconds and the scalar properties packed into one integer.
+    The character frequency map is recounted from the value when the record
+    is serialized rather than kept per entry. The full JSON encoding is
+    cached in ``encoded`` the first time it is asked for, so listings after
+    that only concatenate bytes.
+    """
+
+    __slots__ = ('value', 'digest', 'created', 'packed', 'seq', 'encoded')
+
+    def __init__(self, value, digest, created, length, is_palindrome, unique_characters, word_count, seq=0):
+        self.value = value
+        self.digest = digest
+        self.created = created
+        self.packed = (
+            length << _LENGTH_SHIFT
+            | word_count << _WORDS_SHIFT
+            | unique_characters << _UNIQUE_SHIFT
+            | int(is_palindrome)
+        )
+        self.seq = seq
+        self.encoded = None
+
+    @classmethod
+    def from_entry(cls, entry):
+        props = entry['properties']
+        return cls(
+            entry['value'],
+            bytes.fromhex(entry['id']),
+            timestamp_to_micros(entry['created_at']),
+            props['length'],
+            props['is_palindrome'],
+            props['unique_characters'],
+            props['word_count'],
+        )
+
+    @classmethod
+    def from_row(cls, row):
+        entry_id, value, created, length, is_palindrome, unique_characters, word_count = row
+        return cls(value, bytes.fromhex(entry_id), created, length, is_palindrome, unique_characters, word_count)
+
+    @property
+    def id(self):
+        return self.digest.hex()
+
+    @property
+    def length(self):
+        return self.packed >> _LENGTH_SHIFT
+
+    @property
+    def word_count(self):
+        return self.packed >> _WORDS_SHIFT & _WORDS_MASK
+
+    @property
+    def unique_characters(self):
+        return self.packed >> _UNIQUE_SHIFT & _UNIQUE_MASK
+
+    @property
+    def is_palindrome(self):
+        return bool(self.packed & 1)
+
+    @property
+    def created_at(self):
+        return micros_to_timestamp(self.created)
+
+    def to_row(self):
+        """Flat list form used by the persistence log and snapshots."""
+        return [self.id, self.value, self.created, self.length, self.is_palindrome,
+                self.unique_characters, self.word_count]
+
+    def to_dict(self, fields=None):
+        """Return the entry as the API serializes it, narrowed to fields if given."""
+        entry_id = self.id
+        properties = {
+            'length': self.length,
+            'is_palindrome': self.is_palindrome,
+            'unique_characters': self.unique_characters,
+            'word_count': self.word_count,
+            'sha256_hash': entry_id,
+        }
+        # Recounting the map dominates serialization, so skip it when not asked for
+        if wants_frequency_map(fields):
+            properties['character_frequency_map'] = dict(Counter(self.value))
+        entry = {
+            'id': entry_id,
+            'value': self.value,
+            'properties': properties,
+            'created_at': self.created_at,
+        }
+        return project_entry(entry, fields)
+
+    def to_json(self, fields=None):
+        """Return to_dict(fields) encoded as JSON bytes; whole entries are encoded once."""
+        if fields is not None:
+            return encode_json(self.to_dict(fields))
+        if self.encoded is None:
+            self.encoded = encode_json(self.to_dict())
+        return self.encoded
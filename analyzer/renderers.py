@@ -0,0 +1,14 @@
+from rest_framework.renderers import BaseRenderer
+
+from .changes import EVENT_STREAM_CONTENT_TYPE, format_event
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets views negotiate Server-Sent Events; plain responses become one ``error`` event."""
+
+    media_type = EVENT_STREAM_CONTENT_TYPE
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b'' if data is None else format_event('error', data)
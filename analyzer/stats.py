@@ -0,0 +1,74 @@
+from collections import Counter
+
+
+class CorpusStats:
+    """Running aggregates over stored strings, updated one record at a time.
+
+    Adding or removing a record only touches the counters for its own
+    length, word count and characters, so serving the totals does not
+    depend on how many strings are stored.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.palindromes = 0
+        self.total_length = 0
+        self.total_words = 0
+        self.lengths = Counter()
+        self.word_counts = Counter()
+        self.characters = Counter()
+
+    @classmethod
+    def from_records(cls, records):
+        stats = cls()
+        for record in records:
+            stats.add(record)
+        return stats
+
+    def add(self, record):
+        self.count += 1
+        self.palindromes += record.is_palindrome
+        self.total_length += record.length
+        self.total_words += record.word_count
+        self.lengths[record.length] += 1
+        self.word_counts[record.word_count] += 1
+        self.characters.update(record.value)
+
+    def remove(self, record):
+        self.count -= 1
+        self.palindromes -= record.is_palindrome
+        self.total_length -= record.length
+        self.total_words -= record.word_count
+        _decrement(self.lengths, record.length)
+        _decrement(self.word_counts, record.word_count)
+        for char, count in Counter(record.value).items():
+            _decrement(self.characters, char, count)
+
+    def clear(self):
+        self.__init__()
+
+    def as_dict(self):
+        count = self.count
+        return {
+            'count': count,
+            'is_palindrome': {'true': self.palindromes, 'false': count - self.palindromes},
+            'length': {
+                'min': min(self.lengths) if count else None,
+                'max': max(self.lengths) if count else None,
+                'mean': self.total_length / count if count else None,
+                'histogram': dict(sorted(self.lengths.items())),
+            },
+            'word_count': {
+                'mean': self.total_words / count if count else None,
+                'distribution': dict(sorted(self.word_counts.items())),
+            },
+            'character_frequency': dict(self.characters.most_common()),
+        }
+
+
+def _decrement(counter, key, amount=1):
+    remaining = counter[key] - amount
+    if remaining > 0:
+        counter[key] = remaining
+    else:
+        del counter[key]
@@ -0,0 +1,605 @@
+import atexit
+import threading
+import uuid
+from bisect import bisect_right
+from collections import namedtuple
+from contextlib import contextmanager
+from itertools import dropwhile, islice, takewhile
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import StrIndex
+from django.utils.module_loading import import_string
+
+from .changes import CLEAR, CREATE, DELETE, ChangeFeed
+from . import columnar as columnar_module
+from .columnar import ColumnarIndex
+from .eviction import Capacity, EntryTooLarge, now_micros
+from .filters import project_entry, wants_frequency_map
+from .indexes import PropertyIndex
+from .persistence import AppendOnlyLog
+from .records import StringRecord
+from .stats import CorpusStats
+from .utils import encode_json
+
+DEFAULT_BACKEND = 'analyzer.storage.InMemoryStringStore'
+
+# Filters answered from the scalar property columns, and those needing the text indexes
+SCALAR_FILTERS = frozenset(['is_palindrome', 'min_length', 'max_length', 'word_count'])
+TEXT_FILTERS = frozenset(['contains_character', 'contains'])
+
+# A page of query results: the entries, the total number of matches and the
+# sequence number to resume after, or None on the last page
+Page = namedtuple('Page', ['entries', 'count', 'next_seq'])
+
+# Entries fetched per step when a store is exported
+EXPORT_PAGE_SIZE = 1000
+
+
+class BaseStringStore:
+    """Interface the views use to store analyzed strings keyed by SHA-256.
+
+    Entries are ordered by an insertion sequence number that never goes
+    backwards, which is what listing cursors refer to. ``generation`` changes
+    with every insert and delete, so callers can cache anything derived from
+    the stored data until it moves on.
+    """
+
+    generation = None
+
+    # ChangeFeed of inserts and deletes, on backends that keep one
+    changes = None
+    # Whether calls may block on I/O; async views then run them on a thread
+    blocking = True
+
+    @property
+    def version(self):
+        """Token identifying the current contents of the store, or None if untracked."""
+        return None if self.generation is None else str(self.generation)
+
+    @classmethod
+    def from_settings(cls):
+        return cls()
+
+    def __contains__(self, entry_id):
+        return self.get(entry_id) is not None
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def get(self, entry_id, default=None):
+        raise NotImplementedError
+
+    def values(self):
+        raise NotImplementedError
+
+    def add(self, entry):
+        """Insert entry unless its id is already stored; return whether it was added.
+
+        Raises EntryTooLarge when the entry alone exceeds the store's byte budget.
+        """
+        raise NotImplementedError
+
+    def add_many(self, entries):
+        """Insert entries in one store update; return whether each one was added.
+
+        Entries too large to ever be stored are skipped and reported as None.
+        """
+        added = []
+        for entry in entries:
+            try:
+                added.append(self.add(entry))
+            except EntryTooLarge:
+                added.append(None)
+        return added
+
+    def pop(self, entry_id, default=None):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def query(self, filters, after=None, limit=None, fields=None, encoded=False, lazy=False):
+        """Return the Page of entries matching filters after sequence `after`.
+
+        Entries are narrowed to ``fields`` (see filters.parse_fields) and, with
+        ``encoded=True``, given as JSON bytes ready to concatenate. With
+        ``lazy=True`` they are an iterator that builds each entry as it is
+        consumed, for responses streamed to the client.
+        """
+        raise NotImplementedError
+
+    def export(self):
+        """Yield every entry as JSON bytes in sequence order, a page at a time."""
+        after = None
+        while True:
+            page = self.query({}, after=after, limit=EXPORT_PAGE_SIZE, encoded=True)
+            yield from page.entries
+            if page.next_seq is None:
+                return
+            after = page.next_seq
+
+    def stats(self, filters=None):
+        """Return aggregate statistics over the entries matching filters."""
+        entries = self.query(filters or {}).entries
+        return CorpusStats.from_records(map(StringRecord.from_entry, entries)).as_dict()
+
+
+class InMemoryStringStore(BaseStringStore):
+    """Per-process store of analyzed strings with secondary property indexes.
+
+    Entries are kept as compact StringRecords keyed by their raw digest and
+    turned back into API dicts when read. When given an AppendOnlyLog the
+    store is rebuilt from it on creation and every change is written to it.
+
+    With ``columnar=True`` the scalar filters run as vectorized scans over a
+    ColumnarIndex instead of the per-property indexes, which wins for broad
+    analytics queries over large corpora. ``ngram_index=True`` adds the
+    trigram index for ``contains`` filters, at a cost on every insert and
+    on startup replay.
+
+    Corpus-wide statistics are kept up to date on every insert and delete,
+    so unfiltered ``stats()`` calls cost the same at any size.
+
+    The store is safe to share between threads (gunicorn ``--threads``).
+    Writers and index lookups take one lock for as long as it takes to update
+    or intersect the indexes; records never change once stored, so turning
+    them into API dicts, the bulk of a read, happens outside it on a
+    snapshot of the matching records.
+
+    Given a Capacity the store stays within an entry count, byte budget and
+    TTL, evicting on every insert (and dropping expired entries on reads);
+    evictions are written to the log like deletes. Given a ChangeFeed every
+    change after startup is also recorded there.
+    """
+
+    def __init__(self, log=None, columnar=False, capacity=None, changes=None, ngram_index=False):
+        self._records = {}
+        self._next_seq = 0
+        self._generation = 0
+        # Generations restart at zero with the process, the epoch tells runs apart
+        self.epoch = uuid.uuid4().hex[:8]
+        self.index = PropertyIndex(self._records, ngrams=ngram_index)
+        self.columns = ColumnarIndex() if columnar else None
+        self.aggregates = CorpusStats()
+        self._lock = threading.RLock()
+        self.capacity = capacity
+        self.log = log
+        # Writes to the log, its fsyncs and snapshots block on disk I/O
+        self.blocking = log is not None
+        if log is not None:
+            for record in log.load().values():
+                self._insert(record)
+            self._evict()
+        # Replaying the log is not a change clients could have missed
+        self.changes = changes
+        if changes is not None:
+            # Feed cursors name the epoch, so ones from before a restart are refused
+            changes.epoch = self.epoch
+
+    @classmethod
+    def from_settings(cls):
+        columnar = getattr(settings, 'ANALYZER_COLUMNAR', False)
+        if columnar and columnar_module.numpy is None:
+            # Pure Python column scans are slower than the default indexes
+            raise ImproperlyConfigured('ANALYZER_COLUMNAR requires NumPy (pip install numpy)')
+        log = None
+        data_dir = getattr(settings, 'ANALYZER_DATA_DIR', None)
+        if data_dir:
+            log = AppendOnlyLog(
+                data_dir,
+                fsync=getattr(settings, 'ANALYZER_FSYNC', 'batch'),
+                batch_size=getattr(settings, 'ANALYZER_FSYNC_BATCH_SIZE', 100),
+                snapshot_every=getattr(settings, 'ANALYZER_SNAPSHOT_EVERY', 100000),
+            )
+            atexit.register(log.close)
+        return cls(
+            log=log,
+            columnar=columnar,
+            ngram_index=getattr(settings, 'ANALYZER_NGRAM_INDEX', False),
+            capacity=Capacity.from_settings(),
+            changes=ChangeFeed.from_settings(),
+        )
+
+    @property
+    def generation(self):
+        # Expire due entries first, so cached listings and ETags never outlive a TTL
+        if self.capacity is not None and self.capacity.ttl:
+            with self._lock:
+                self._evict()
+        return self._generation
+
+    @property
+    def version(self):
+        return f'{self.epoch}.{self.generation}'
+
+    @contextmanager
+    def lock_if_free(self):
+        """Hold the store lock for the block if no other thread has it; yield whether it is held.
+
+        Lets async views run a call on the event loop only when it cannot wait
+        on a writer, such as a sync view inserting a large batch.
+        """
+        held = self._lock.acquire(blocking=False)
+        try:
+            yield held
+        finally:
+            if held:
+                self._lock.release()
+
+    def __contains__(self, entry_id):
+        return self._lookup(entry_id) is not None
+
+    def __len__(self):
+        return len(self._records)
+
+    def get(self, entry_id, default=None):
+        record = self._lookup(entry_id, touch=True)
+        return default if record is None else record.to_dict()
+
+    def values(self):
+        return (record.to_dict() for record in list(self._records.values()))
+
+    def add(self, entry):
+        record = StringRecord.from_entry(entry)
+        if self.capacity is not None and not self.capacity.fits(record):
+            # Storing it would only evict everything else, then the entry itself
+            raise EntryTooLarge("String is larger than the store's byte budget")
+        with self._lock:
+            # Insert-if-absent: the duplicate check and the insert are one step
+            if not self._insert(record):
+                return False
+            if self.log is not None:
+                self.log.append_create(record)
+            if self.changes is not None:
+                self.changes.append(CREATE, record)
+            self._evict()
+            if self.log is not None:
+                self._compact_if_needed()
+        return True
+
+    def add_many(self, entries):
+        # Readers see either none or all of the batch
+        with self._lock:
+            return super().add_many(entries)
+
+    def pop(self, entry_id, default=None):
+        with self._lock:
+            record = self._lookup(entry_id)
+            if record is None:
+                return default
+            self._remove(record)
+            if self.log is not None:
+                self._compact_if_needed()
+        return record.to_dict()
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self.index.clear()
+            self.aggregates.clear()
+            if self.columns is not None:
+                self.columns.clear()
+            if self.capacity is not None:
+                self.capacity.clear()
+            self._generation += 1
+            if self.changes is not None:
+                self.changes.append(CLEAR)
+            if self.log is not None:
+                self.log.snapshot([])
+
+    def query(self, filters, after=None, limit=None, fields=None, encoded=False, lazy=False):
+        if filters:
+            with self._lock:
+                self._evict()
+                ordered = self._select(filters)
+            count = len(ordered)
+            start = 0 if after is None else bisect_right(ordered, after, key=_seq)
+            end = count if limit is None else min(start + limit, count)
+            next_seq = ordered[end - 1].seq if end < count and end > start else None
+            records = islice(ordered, start, end)
+        elif limit is not None:
+            with self._lock:
+                self._evict()
+                count = len(self._records)
+                # One extra record tells whether another page follows
+                records = list(islice(self._scan(after), limit + 1))
+            next_seq = records[limit - 1].seq if len(records) > limit else None
+            records = records[:limit]
+        else:
+            with self._lock:
+                self._evict()
+                count = len(self._records)
+                stop = self._next_seq
+            next_seq = None
+            records = self._scan_in_chunks(after, stop)
+        if encoded:
+            entries = (record.to_json(fields) for record in records)
+        else:
+            entries = (record.to_dict(fields) for record in records)
+        return Page(entries if lazy else list(entries), count, next_seq)
+
+    def export(self):
+        # Only references to the records are copied; each is encoded as it is sent
+        with self._lock:
+            self._evict()
+            records = list(self._records.values())
+        for record in records:
+            # Reuse a cached encoding, but do not cache one for every exported record
+            yield record.encoded or encode_json(record.to_dict())
+
+    def stats(self, filters=None):
+        with self._lock:
+            self._evict()
+            if not filters:
+                return self.aggregates.as_dict()
+            records = self._select(filters)
+        return CorpusStats.from_records(records).as_dict()
+
+    def _scan(self, after=None):
+        """Iterate the records after sequence number after, in order, without copying them.
+
+        Call with the lock held. A record's position is its sequence number
+        minus the deletions before it, so at least ``after + 1`` minus every
+        deletion so far can be skipped without looking at the records.
+        """
+        records = iter(self._records.values())
+        if after is None:
+            return records
+        skip = after + 1 - (self._next_seq - len(self._records))
+        if skip > 0:
+            records = islice(records, skip, None)
+        return dropwhile(lambda record: record.seq <= after, records)
+
+    def _scan_in_chunks(self, after, stop):
+        """Yield the records from after up to sequence number stop, taking the lock per chunk.
+
+        Records deleted while this runs may be left out; ones inserted after
+        it started are not included.
+        """
+        while True:
+            with self._lock:
+                chunk = list(islice(takewhile(lambda record: record.seq < stop, self._scan(after)), EXPORT_PAGE_SIZE))
+            yield from chunk
+            if len(chunk) < EXPORT_PAGE_SIZE:
+                return
+            after = chunk[-1].seq
+
+    def _select(self, filters):
+        """Return the records matching filters in sequence order."""
+        records = self._records
+        if self.columns is not None and SCALAR_FILTERS.intersection(filters):
+            # Columnar rows come back in insertion order, no sort needed
+            keys = self.columns.select(filters)
+            text_filters = {name: filters[name] for name in TEXT_FILTERS.intersection(filters)}
+            if text_filters:
+                matching = self.index.select(text_filters)
+                keys = [key for key in keys if key in matching]
+            return [records[key] for key in keys]
+        keys = self.index.select(filters)
+        if keys is None:
+            # Dict order is insertion order, which is sequence order
+            return list(records.values())
+        return sorted((records[key] for key in keys), key=_seq)
+
+    def _insert(self, record):
+        if record.digest in self._records:
+            return False
+        record.seq = self._next_seq
+        self._records[record.digest] = record
+        self._next_seq += 1
+        self.index.add(record)
+        self.aggregates.add(record)
+        if self.columns is not None:
+            self.columns.add(record)
+        if self.capacity is not None:
+            self.capacity.add(record)
+        self._generation += 1
+        return True
+
+    def _remove(self, record):
+        del self._records[record.digest]
+        self.index.remove(record)
+        self.aggregates.remove(record)
+        if self.columns is not None:
+            self.columns.remove(record)
+        if self.capacity is not None:
+            self.capacity.remove(record)
+        self._generation += 1
+        if self.log is not None:
+            self.log.append_delete(record.id)
+        if self.changes is not None:
+            self.changes.append(DELETE, record)
+
+    def _lookup(self, entry_id, touch=False):
+        """Return the live record for entry_id, dropping it if its TTL has passed."""
+        digest = _digest(entry_id)
+        if self.capacity is None:
+            return self._records.get(digest)
+        with self._lock:
+            record = self._records.get(digest)
+            if record is None:
+                return None
+            if self.capacity.expired(record, now_micros()):
+                # It may not be first in line when it was imported with an older created_at
+                self.capacity.evictions['expired'] += 1
+                self._remove(record)
+                return None
+            if touch:
+                self.capacity.touch(record)
+            return record
+
+    def _evict(self):
+        """Drop expired entries, then the policy's victims until within capacity."""
+        if self.capacity is None:
+            return
+        now = now_micros()
+        while True:
+            record = self.capacity.next_victim(now)
+            if record is None:
+                return
+            self._remove(record)
+
+    def _compact_if_needed(self):
+        if self.log.needs_snapshot():
+            self.log.snapshot(self._records.values())
+
+
+def _digest(entry_id):
+    try:
+        return bytes.fromhex(entry_id)
+    except ValueError:
+        return None
+
+
+def _seq(record):
+    return record.seq
+
+
+class DatabaseStringStore(BaseStringStore):
+    """Store backed by the AnalyzedString model so every worker process shares it.
+
+    Filters run as indexed SQL queries. With SQLite in WAL mode (see DATABASES
+    in settings) readers never block the writer, and inserts rely on the
+    primary key, so 409 and 404 answers stay consistent across gunicorn workers.
+    """
+
+    def __init__(self, using='default'):
+        # Imported here so the rest of the module, and the benchmarks using the
+        # in-memory store, load before Django is set up
+        from .models import AnalyzedString, StoreVersion
+        self.model = AnalyzedString
+        self.version_model = StoreVersion
+        self.using = using
+
+    @property
+    def objects(self):
+        return self.model.objects.using(self.using)
+
+    @property
+    def generation(self):
+        # Shared by every worker, so per-process caches see each other's writes
+        return self.version_model.objects.using(self.using).values_list('value', flat=True).get(pk=1)
+
+    def __contains__(self, entry_id):
+        return self.objects.filter(pk=entry_id).exists()
+
+    def __len__(self):
+        return self.objects.count()
+
+    def get(self, entry_id, default=None):
+        row = self.objects.filter(pk=entry_id).first()
+        return default if row is None else row.to_entry()
+
+    def values(self):
+        return self.query({}).entries
+
+    def add(self, entry):
+        try:
+            with transaction.atomic(using=self.using):
+                row = self.model.from_entry(entry, self._bump_version())
+                row.save(using=self.using, force_insert=True)
+        except IntegrityError:
+            return False
+        return True
+
+    def add_many(self, entries):
+        with transaction.atomic(using=self.using):
+            return [self.add(entry) for entry in entries]
+
+    def pop(self, entry_id, default=None):
+        with transaction.atomic(using=self.using):
+            row = self.objects.filter(pk=entry_id).first()
+            if row is None:
+                return default
+            entry = row.to_entry()
+            row.delete()
+            self._bump_version()
+        return entry
+
+    def clear(self):
+        with transaction.atomic(using=self.using):
+            self.objects.all().delete()
+            self._bump_version()
+
+    def query(self, filters, after=None, limit=None, fields=None, encoded=False, lazy=False):
+        queryset = self.filter_queryset(self.objects.all(), filters)
+        count = queryset.count()
+        frequency_map = wants_frequency_map(fields)
+        if not frequency_map:
+            queryset = queryset.defer('character_frequency_map')
+        if after is not None:
+            queryset = queryset.filter(seq__gt=after)
+
+        next_seq = None
+        if limit is not None:
+            # Fetch one extra row to learn whether another page follows
+            rows = list(queryset[:limit + 1])
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_seq = rows[-1].seq
+        elif lazy:
+            rows = queryset.iterator(chunk_size=EXPORT_PAGE_SIZE)
+        else:
+            rows = list(queryset)
+        entries = (project_entry(row.to_entry(frequency_map), fields) for row in rows)
+        if encoded:
+            entries = map(encode_json, entries)
+        return Page(entries if lazy else list(entries), count, next_seq)
+
+    def export(self):
+        # Stream rows with a server-side cursor where the database supports one
+        for row in self.objects.order_by('seq').iterator(chunk_size=EXPORT_PAGE_SIZE):
+            yield encode_json(row.to_entry())
+
+    def stats(self, filters=None):
+        # Every worker writes to the table, so aggregate it in SQL on demand
+        queryset = self.filter_queryset(self.objects.all(), filters or {})
+        stats = CorpusStats()
+        totals = queryset.aggregate(count=Count('pk'), length=Sum('length'), words=Sum('word_count'))
+        stats.count = totals['count']
+        stats.total_length = totals['length'] or 0
+        stats.total_words = totals['words'] or 0
+        stats.palindromes = queryset.filter(is_palindrome=True).count()
+        for field, counter in (('length', stats.lengths), ('word_count', stats.word_counts)):
+            for value, count in queryset.order_by().values_list(field).annotate(count=Count('pk')):
+                counter[value] = count
+        for frequencies in queryset.values_list('character_frequency_map', flat=True).iterator():
+            stats.characters.update(frequencies)
+        return stats.as_dict()
+
+    @staticmethod
+    def filter_queryset(queryset, filters):
+        """Translate listing filters into AnalyzedString queryset filters."""
+        lookups = {}
+        if 'is_palindrome' in filters:
+            lookups['is_palindrome'] = filters['is_palindrome']
+        if 'min_length' in filters:
+            lookups['length__gte'] = filters['min_length']
+        if 'max_length' in filters:
+            lookups['length__lte'] = filters['max_length']
+        if 'word_count' in filters:
+            lookups['word_count'] = filters['word_count']
+        queryset = queryset.filter(**lookups)
+        # StrIndex compiles to INSTR, which unlike LIKE is case-sensitive on SQLite
+        # and, unlike JSON key lookups on the frequency map, matches quotes too
+        if 'contains_character' in filters:
+            queryset = queryset.alias(
+                character_at=StrIndex('value', Value(filters['contains_character'])),
+            ).filter(character_at__gt=0)
+        if 'contains' in filters:
+            queryset = queryset.alias(contains_at=StrIndex('value', Value(filters['contains']))).filter(contains_at__gt=0)
+        return queryset
+
+    def _bump_version(self):
+        versions = self.version_model.objects.using(self.using)
+        versions.filter(pk=1).update(value=F('value') + 1)
+        return versions.values_list('value', flat=True).get(pk=1)
+
+
+def build_store():
+    """Create the store backend named by the ANALYZER_STORAGE_BACKEND setting."""
+    backend = import_string(getattr(settings, 'ANALYZER_STORAGE_BACKEND', DEFAULT_BACKEND))
+    return backend.from_settings()
@@ -1,9 +1,52 @@
+import asyncio
 import json
-from django.test import TestCase
+import os
+import pstats
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import importlib.util
+import time
+from io import StringIO
+from unittest import mock, skipUnless
+from asgiref.sync import async_to_sync
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import AsyncRequestFactory, TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APITestCase
-from .views import strings_storage, compute_properties
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase
+from . import apibench, async_views, benchmarks, changes, columnar, engine, eviction, indexes, metrics, nlquery, persistence, transfer, utils, views
+from .cache import QueryCache
+from .changes import ChangeFeed
+from .eviction import Capacity
+from .persistence import AppendOnlyLog
+from .records import StringRecord
+from .stats import CorpusStats
+from .storage import DatabaseStringStore, InMemoryStringStore
+from .utils import compute_properties
+from .views import strings_storage
+
+
+def seed_storage(count, prefix='seed'):
+    """Fill storage with synthetic entries without going through the API."""
+    for i in range(count):
+        value = f'{prefix} {i}'
+        properties = compute_properties(value)
+        strings_storage.add({
+            'id': properties['sha256_hash'],
+            'value': value,
+            'properties': properties,
+            'created_at': '2025-01-01T00:00:00Z',
+        })
+
+
+def call_async_view(view_class, request, **kwargs):
+    """Run one of the async views to completion from synchronous test code."""
+    return async_to_sync(view_class.as_view())(request, **kwargs)
 
 
 class StringAnalyzerAPITestCase(APITestCase):
@@ -238,6 +281,13 @@ class StringAnalyzerAPITestCase(APITestCase):
         self.assertEqual(response.data['count'], 1)
         self.assertEqual(response.data['data'][0]['value'], 'hello')
 
+        # A quoted letter is the letter itself, not the quote mark
+        for query in ("strings containing the letter 'h'", 'strings containing the character "h"'):
+            response = self.client.get(url, {'query': query})
+            self.assertEqual(response.data['interpreted_query']['parsed_filters'], {'contains_character': 'h'})
+            self.assertEqual(response.data['count'], 1)
+        self.assertEqual(nlquery.parse_query("words containing the letter 'a'"), {'contains_character': 'a'})
+
     def test_natural_language_filter_missing_query(self):
         """Test natural language filter with missing query parameter."""
         url = reverse('string-natural-language-filter')
@@ -252,3 +302,1209 @@ class StringAnalyzerAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['count'], 0)
         self.assertEqual(len(response.data['data']), 0)
+
+    def _time_detail_lookups(self, value, repeats=200):
+        url = reverse('string-detail', kwargs={'string_value': value})
+        best = float('inf')
+        for _ in range(3):
+            start = time.perf_counter()
+            for _ in range(repeats):
+                self.client.get(url)
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def test_detail_lookup_latency_is_flat(self):
+        """Benchmark: detail lookups cost the same with 100 or 20,000 stored strings."""
+        seed_storage(100)
+        self.client.post(reverse('string-list-create'), {'value': 'needle'}, format='json')
+        small = self._time_detail_lookups('needle')
+
+        seed_storage(20000, prefix='bulk')
+        large = self._time_detail_lookups('needle')
+        self.assertLess(large, small * 3)
+
+        response = self.client.delete(reverse('string-detail', kwargs={'string_value': 'needle'}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(len(strings_storage), 20100)
+
+    def test_get_strings_combined_filters_use_indexes(self):
+        """Test combined filters match a brute-force scan and follow deletes."""
+        url = reverse('string-list-create')
+        for value in ['racecar', 'level up', 'noon', 'hello world', 'a man a plan', 'kayak']:
+            self.client.post(url, {'value': value}, format='json')
+        seed_storage(50)
+
+        params = {'is_palindrome': 'true', 'min_length': '4', 'max_length': '7', 'word_count': '1', 'contains_character': 'a'}
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([entry['value'] for entry in response.data['data']], ['racecar', 'kayak'])
+
+        self.client.delete(reverse('string-detail', kwargs={'string_value': 'kayak'}))
+        response = self.client.get(url, params)
+        self.assertEqual([entry['value'] for entry in response.data['data']], ['racecar'])
+
+        response = self.client.get(url, {'min_length': '7', 'max_length': '7'})
+        expected = [entry['value'] for entry in strings_storage.values() if entry['properties']['length'] == 7]
+        self.assertEqual([entry['value'] for entry in response.data['data']], expected)
+
+    def test_get_strings_cursor_pagination(self):
+        """Test walking the listing with limit/cursor returns every entry once."""
+        url = reverse('string-list-create')
+        seed_storage(7)
+        seen = []
+        params = {'limit': '3'}
+        while True:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(entry['value'] for entry in response.data['data'])
+            if response.data['next_cursor'] is None:
+                break
+            params['cursor'] = response.data['next_cursor']
+            # Deleting an already returned entry must not shift later pages
+            self.client.delete(reverse('string-detail', kwargs={'string_value': seen[0]}))
+        self.assertEqual(seen, [f'seed {i}' for i in range(7)])
+
+    def test_get_strings_invalid_pagination(self):
+        """Test invalid cursor and limit parameters."""
+        url = reverse('string-list-create')
+        for params in ({'cursor': '!!'}, {'limit': '0'}, {'limit': 'many'}):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('error', response.data)
+
+    def test_get_strings_streamed(self):
+        """Test the streamed listing matches the regular response."""
+        url = reverse('string-list-create')
+        seed_storage(5)
+        regular = self.client.get(url, {'word_count': '2', 'limit': '4'})
+        views.query_cache.clear()
+        streamed = self.client.get(url, {'word_count': '2', 'limit': '4', 'stream': 'true'})
+        self.assertTrue(streamed.streaming)
+        body = json.loads(b''.join(streamed.streaming_content))
+        self.assertEqual(body, json.loads(regular.content))
+        # Streamed pages are encoded as they are sent and never cached
+        self.assertEqual(views.query_cache.stats()['size'], 0)
+
+        url = reverse('string-natural-language-filter')
+        streamed = self.client.get(url, {'query': 'strings containing the letter z', 'stream': '1'})
+        body = json.loads(b''.join(streamed.streaming_content))
+        self.assertEqual(body['count'], 0)
+        self.assertEqual(body['data'], [])
+
+    def test_post_strings_batch_json(self):
+        """Test batch creation from a JSON array reports per-item status."""
+        self.client.post(reverse('string-list-create'), {'value': 'radar'}, format='json')
+        url = reverse('string-batch-create')
+        payload = ['hello', {'value': 'world'}, 'radar', 'hello', 42, '']
+        response = self.client.post(url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['status'] for item in response.data['results']], [201, 201, 409, 409, 422, 400])
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['duplicates'], 2)
+        self.assertEqual(response.data['invalid'], 2)
+        self.assertEqual(response.data['results'][0]['id'], compute_properties('hello')['sha256_hash'])
+        self.assertEqual(len(strings_storage), 3)
+
+    def test_post_strings_batch_ndjson(self):
+        """Test batch creation from an NDJSON stream."""
+        url = reverse('string-batch-create')
+        body = '"hello"\n\n{"value": "level"}\n"hello"\n'
+        response = self.client.post(url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['status'] for item in response.data['results']], [201, 201, 409])
+        response = self.client.get(reverse('string-detail', kwargs={'string_value': 'level'}))
+        self.assertTrue(response.data['properties']['is_palindrome'])
+
+    def test_post_strings_batch_invalid_body(self):
+        """Test malformed batch bodies are rejected without inserting anything."""
+        url = reverse('string-batch-create')
+        response = self.client.post(url, {'value': 'hello'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url, '"hello"\nnot json\n', content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        for body in ('5', 'null', 'true'):
+            response = self.client.post(url, body, content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(strings_storage), 0)
+
+    @override_settings(ANALYZER_PARALLEL_THRESHOLD=64, ANALYZER_MAX_WORKERS=2)
+    def test_engine_process_pool_matches_inline(self):
+        """Test pooled analysis gives the same results as compute_properties."""
+        self.addCleanup(engine.shutdown)
+        large = 'Never odd or even ' * 20
+        values = [f'value {i}' for i in range(40)] + [large, 'Racecar', large[::-1]]
+        self.assertEqual(engine.analyze(large), compute_properties(large))
+        self.assertEqual(engine.analyze_many(values), [compute_properties(value) for value in values])
+
+        response = self.client.post(reverse('string-batch-create'), values, format='json')
+        self.assertEqual(response.data['created'], len(values))
+        self.assertEqual(strings_storage.get(compute_properties(large)['sha256_hash'])['properties'], compute_properties(large))
+
+    def test_compute_properties_matches_reference(self):
+        """Test the single-pass kernel against the original implementation."""
+        values = ['a', 'ab', 'Aba', 'Never odd or even', 'noon  ', 'İi', 'ß', 'été\tsummer\n',
+                  benchmarks.make_text(5000), 'x' * 3 + benchmarks.make_text(70001)[::-1]]
+        for value in values:
+            self.assertEqual(compute_properties(value), benchmarks.reference_compute_properties(value), value)
+        with mock.patch.object(utils, 'HASH_CHUNK_SIZE', 7):
+            self.assertEqual(compute_properties(values[-1]), benchmarks.reference_compute_properties(values[-1]))
+
+    def test_benchmark_compute_properties(self):
+        """Smoke-test the compute_properties micro-benchmark at small sizes."""
+        results = benchmarks.benchmark_compute_properties(sizes=(10, 1024), repeats=1)
+        self.assertEqual([row['size'] for row in results], [10, 1024])
+        for row in results:
+            self.assertGreater(row['reference_seconds'], 0)
+            self.assertGreater(row['current_seconds'], 0)
+
+    def test_store_persists_through_append_only_log(self):
+        """Test a persisted store survives a restart, compaction and a torn log write."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        store = InMemoryStringStore(log=AppendOnlyLog(directory, fsync='always', snapshot_every=3))
+        # Log writes hit the disk, so async views must not run them on the event loop
+        self.assertTrue(store.blocking)
+        self.assertFalse(InMemoryStringStore().blocking)
+        entries = list(benchmarks.make_entries(5))
+        for entry in entries:
+            store.add(entry)
+        store.pop(entries[1]['id'])
+        store.log.close()
+        with open(os.path.join(directory, 'strings.log'), 'a') as log:
+            log.write('{"op": "create", "ent')
+
+        restored = InMemoryStringStore(log=AppendOnlyLog(directory))
+        self.assertEqual([entry['id'] for entry in restored.values()], [entries[i]['id'] for i in (0, 2, 3, 4)])
+        self.assertEqual(restored.get(entries[4]['id']), entries[4])
+        self.assertEqual([entry['value'] for entry in restored.query({'word_count': 2}).entries], [entries[0]['value']])
+        # The torn tail is cut off, so writes made after the restart survive the next one
+        more = list(benchmarks.make_entries(2, prefix='after restart'))
+        for entry in more:
+            restored.add(entry)
+        restored.log.close()
+        restarted = InMemoryStringStore(log=AppendOnlyLog(directory))
+        self.assertEqual([entry['id'] for entry in restarted.values()],
+                         [entries[i]['id'] for i in (0, 2, 3, 4)] + [entry['id'] for entry in more])
+        restarted.log.close()
+
+    def test_log_directory_has_one_writer(self):
+        """Test a second process cannot open a data directory that is in use."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        log = AppendOnlyLog(directory)
+        with self.assertRaises(persistence.DataDirLocked):
+            AppendOnlyLog(directory)
+        log.close()
+        AppendOnlyLog(directory).close()
+
+    def test_benchmarks_import_without_django_setup(self):
+        """Test ``python -m analyzer.benchmarks`` can load its modules before Django is configured."""
+        env = {key: value for key, value in os.environ.items() if key != 'DJANGO_SETTINGS_MODULE'}
+        subprocess.run([sys.executable, '-c', 'import analyzer.benchmarks'], cwd=benchmarks.PROJECT_DIR, env=env,
+                       check=True, capture_output=True)
+
+    def test_benchmark_persistence_startup(self):
+        """Smoke-test the persistence startup benchmark at a small size."""
+        result = benchmarks.benchmark_persistence_startup(count=200, tail=20)
+        self.assertEqual(result['entries'], 220)
+
+    def test_natural_language_filter_compound_query(self):
+        """Test compound queries compile into the same filters as GET /strings."""
+        for value in ['racecar', 'wow wow wow', 'level eve level', 'hello world', 'noon']:
+            self.client.post(reverse('string-list-create'), {'value': value}, format='json')
+
+        url = reverse('string-natural-language-filter')
+        response = self.client.get(url, {'query': 'Three-word   palindromes longer than 10 characters containing the letter V'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['interpreted_query']['parsed_filters'],
+                         {'word_count': 3, 'is_palindrome': True, 'min_length': 11, 'contains_character': 'v'})
+        self.assertEqual([entry['value'] for entry in response.data['data']], ['level eve level'])
+
+        response = self.client.get(url, {'query': 'non-palindromic strings shorter than 12 characters'})
+        self.assertEqual([entry['value'] for entry in response.data['data']], ['hello world'])
+
+    def test_natural_language_filter_conflicting_filters(self):
+        """Test contradictory queries are rejected with 422."""
+        url = reverse('string-natural-language-filter')
+        for query in ['palindromic non-palindromic strings', 'single word two word strings',
+                      'strings longer than 10 characters and shorter than 5 characters']:
+            response = self.client.get(url, {'query': query})
+            self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+            self.assertIn('error', response.data)
+
+        response = self.client.get(url, {'query': 'word_count=many'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_natural_language_parse_cache(self):
+        """Test queries differing only in spacing share a cached parse."""
+        nlquery._parse_normalized.cache_clear()
+        first = nlquery.parse_query('All single word  palindromic strings')
+        first['word_count'] = 99
+        second = nlquery.parse_query('  All single word palindromic   strings')
+        self.assertEqual(second, {'word_count': 1, 'is_palindrome': True})
+        self.assertEqual(nlquery._parse_normalized.cache_info().hits, 1)
+
+    def test_query_cache_hits_and_invalidation(self):
+        """Test repeated listings are served from the cache until a write."""
+        views.query_cache.clear()
+        hits, misses = views.query_cache.hits, views.query_cache.misses
+        url = reverse('string-list-create')
+        self.client.post(url, {'value': 'radar'}, format='json')
+
+        for _ in range(3):
+            response = self.client.get(url, {'is_palindrome': 'true', 'min_length': '3'})
+            self.assertEqual(response.data['count'], 1)
+        nl_url = reverse('string-natural-language-filter')
+        response = self.client.get(nl_url, {'query': 'palindromic strings at least 3 characters'})
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual((views.query_cache.hits - hits, views.query_cache.misses - misses), (3, 1))
+
+        self.client.post(url, {'value': 'level'}, format='json')
+        response = self.client.get(url, {'min_length': '3', 'is_palindrome': 'true'})
+        self.assertEqual(response.data['count'], 2)
+        self.client.delete(reverse('string-detail', kwargs={'string_value': 'radar'}))
+        response = self.client.get(url, {'min_length': '3', 'is_palindrome': 'true'})
+        self.assertEqual(response.data['count'], 1)
+
+        response = self.client.get(reverse('query-cache-stats'))
+        self.assertEqual(response.data['misses'] - misses, 3)
+        self.assertIn('hit_ratio', response.data)
+
+    def test_query_cache_lru_eviction(self):
+        """Test the cache stays within its size bound."""
+        cache = QueryCache(maxsize=2)
+        seed_storage(3)
+        for word_count in (1, 2, 1, 3, 1):
+            cache.query(strings_storage, {'word_count': word_count})
+        self.assertEqual(cache.stats()['size'], 2)
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.hits, 2)
+
+    def test_detail_conditional_get(self):
+        """Test detail responses carry the hash as ETag and honour If-None-Match."""
+        self.client.post(reverse('string-list-create'), {'value': 'radar'}, format='json')
+        url = reverse('string-detail', kwargs={'string_value': 'radar'})
+        response = self.client.get(url)
+        self.assertEqual(response['ETag'], '"%s"' % compute_properties('radar')['sha256_hash'])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"other"').status_code, status.HTTP_200_OK)
+
+        self.client.delete(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_listing_conditional_get(self):
+        """Test listing ETags change with the store version and the query."""
+        url = reverse('string-list-create')
+        self.client.post(url, {'value': 'radar'}, format='json')
+        etag = self.client.get(url, {'word_count': '1'})['ETag']
+        self.assertNotEqual(etag, self.client.get(url, {'word_count': '2'})['ETag'])
+
+        with mock.patch.object(strings_storage, 'query', side_effect=AssertionError('listing was recomputed')):
+            response = self.client.get(url, {'word_count': '1'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.post(url, {'value': 'level'}, format='json')
+        response = self.client.get(url, {'word_count': '1'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+
+        nl_url = reverse('string-natural-language-filter')
+        etag = self.client.get(nl_url, {'query': 'palindromic strings'})['ETag']
+        response = self.client.get(nl_url, {'query': 'palindromic strings'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_string_record_round_trip(self):
+        """Test compact records serialize back to the exact API entry."""
+        self.client.post(reverse('string-list-create'), {'value': 'Été à Paris'}, format='json')
+        entry = next(iter(strings_storage.values()))
+        record = StringRecord.from_entry(entry)
+        self.assertEqual(record.to_dict(), entry)
+        self.assertEqual(len(record.digest), 32)
+        self.assertIsInstance(record.created, int)
+        self.assertEqual(StringRecord.from_row(record.to_row()).to_dict(), entry)
+
+        entry['created_at'] = '2025-01-01T00:00:00Z'
+        self.assertEqual(StringRecord.from_entry(entry).to_dict(), entry)
+
+    def test_get_strings_fields_projection(self):
+        """Test ?fields= narrows listed entries and skips the frequency map."""
+        url = reverse('string-list-create')
+        seed_storage(3)
+        with mock.patch('analyzer.records.Counter') as counter:
+            response = self.client.get(url, {'fields': 'properties.length, value,id'})
+        counter.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data'][0], {'id': compute_properties('seed 0')['sha256_hash'], 'value': 'seed 0', 'properties': {'length': 6}})
+
+        response = self.client.get(url, {'fields': 'value,properties,properties.length', 'stream': 'true'})
+        body = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(set(body['data'][0]), {'value', 'properties'})
+        self.assertIn('character_frequency_map', body['data'][0]['properties'])
+
+        url = reverse('string-natural-language-filter')
+        response = self.client.get(url, {'query': 'strings containing the letter s', 'fields': 'created_at'})
+        self.assertEqual(response.data['data'][0], {'created_at': '2025-01-01T00:00:00Z'})
+
+        for fields in ('', 'value,properties.colour', 'character_frequency_map'):
+            response = self.client.get(reverse('string-list-create'), {'fields': fields})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_listing_pre_encoded_matches_renderer(self):
+        """Test pre-encoded listings are byte for byte what the JSON renderer produces."""
+        url = reverse('string-list-create')
+        for value in ('level', 'Été\u2028à Paris', 'a "quoted" string'):
+            self.client.post(url, {'value': value}, format='json')
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.content, JSONRenderer().render(response.json()))
+        self.assertEqual(response.data['count'], 3)
+
+        record = next(iter(strings_storage._records.values()))
+        self.assertIs(record.to_json(), record.encoded)
+        self.assertEqual(json.loads(record.encoded), record.to_dict())
+
+        pretty = self.client.get(url, HTTP_ACCEPT='application/json; indent=2')
+        self.assertEqual(json.loads(pretty.content), response.json())
+        self.assertIn(b'\n  ', pretty.content)
+
+    def test_benchmark_entry_memory(self):
+        """Benchmark: compact records take less memory per entry than dicts."""
+        result = benchmarks.benchmark_entry_memory(count=500)
+        self.assertLess(result['record_bytes_per_entry'], result['dict_bytes_per_entry'] / 2)
+
+    def test_get_strings_filter_contains_substring(self):
+        """Test the contains filter matches arbitrary substrings case-sensitively."""
+        url = reverse('string-list-create')
+        for value in ['hello world', 'Hello there', 'yellow', 'say hello', 'hel']:
+            self.client.post(url, {'value': value}, format='json')
+
+        response = self.client.get(url, {'contains': 'hello'})
+        self.assertEqual([entry['value'] for entry in response.data['data']], ['hello world', 'say hello'])
+        response = self.client.get(url, {'contains': 'el', 'max_length': '6'})
+        self.assertEqual([entry['value'] for entry in response.data['data']], ['yellow', 'hel'])
+        response = self.client.get(url, {'contains': ''})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        nl_url = reverse('string-natural-language-filter')
+        response = self.client.get(nl_url, {'query': "strings containing 'Hello'"})
+        self.assertEqual(response.data['interpreted_query']['parsed_filters'], {'contains': 'Hello'})
+        self.assertEqual([entry['value'] for entry in response.data['data']], ['Hello there'])
+        response = self.client.get(nl_url, {'query': 'single word strings containing the substring ell'})
+        self.assertEqual([entry['value'] for entry in response.data['data']], ['yellow'])
+
+    def test_substring_index_matches_scan(self):
+        """Test substring candidates never miss a match, with and without the n-gram index."""
+        for store in [InMemoryStringStore(), InMemoryStringStore(ngram_index=True)]:
+            store.add_many(benchmarks.make_entries(200, prefix='seed'))
+            store.add(next(benchmarks.make_entries(1, prefix='long ' + 'ab' * 30)))
+            with mock.patch.object(indexes, 'MAX_NGRAM_INDEXED_LENGTH', 50):
+                store.add(next(benchmarks.make_entries(1, prefix='very long ' + 'ab' * 40)))
+            values = [entry['value'] for entry in store.values()]
+            for substring in ['seed 1', 'd 19', '7', 'abab', 'long', 'missing', 'ed 1']:
+                page = store.query({'contains': substring})
+                self.assertEqual([entry['value'] for entry in page.entries],
+                                 [value for value in values if substring in value], substring)
+        self.assertTrue(store.index._ngrams)
+
+    def test_get_strings_stats(self):
+        """Test corpus statistics follow creates and deletes and accept listing filters."""
+        url = reverse('string-stats')
+        response = self.client.get(url)
+        self.assertEqual(response.data['count'], 0)
+        self.assertIsNone(response.data['length']['mean'])
+
+        list_url = reverse('string-list-create')
+        for value in ['level', 'hello world', 'noon', 'abc']:
+            self.client.post(list_url, {'value': value}, format='json')
+        self.client.post(reverse('string-batch-create'), ['racecar', 'two words'], format='json')
+        self.client.delete(reverse('string-detail', args=['abc']))
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(response.data['is_palindrome'], {'true': 3, 'false': 2})
+        self.assertEqual(response.data['length']['min'], 4)
+        self.assertEqual(response.data['length']['max'], 11)
+        self.assertEqual(response.data['length']['histogram'], {4: 1, 5: 1, 7: 1, 9: 1, 11: 1})
+        self.assertEqual(response.data['word_count']['distribution'], {1: 3, 2: 2})
+        self.assertEqual(response.data['character_frequency']['l'], 5)
+        self.assertNotIn('b', response.data['character_frequency'])
+
+        response = self.client.get(url, {'word_count': '2'})
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['filters_applied'], {'word_count': 2})
+        self.assertEqual(response.data['is_palindrome'], {'true': 0, 'false': 2})
+
+        response = self.client.get(url, {'min_length': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_async_views_match_sync_views(self):
+        """Test the async handlers answer like the DRF views on the same store."""
+        factory = AsyncRequestFactory()
+
+        def post(value):
+            return factory.post('/strings', {'value': value}, content_type='application/json')
+
+        response = call_async_view(async_views.StringListCreateView, post('racecar'))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        created = json.loads(response.content)
+        self.assertEqual(self.client.get(reverse('string-detail', args=['racecar'])).data, created)
+        self.assertEqual(call_async_view(async_views.StringListCreateView, post('racecar')).status_code, 409)
+        self.assertEqual(call_async_view(async_views.StringListCreateView, post('')).status_code, 400)
+        self.assertEqual(call_async_view(async_views.StringListCreateView, post(5)).status_code, 422)
+        self.client.post(reverse('string-list-create'), {'value': 'hello world'}, format='json')
+
+        params = {'min_length': '5', 'limit': '1'}
+        expected = self.client.get(reverse('string-list-create'), params)
+        response = call_async_view(async_views.StringListCreateView, factory.get('/strings', params))
+        self.assertEqual(json.loads(response.content), json.loads(expected.content))
+        self.assertEqual(response['ETag'], expected['ETag'])
+        request = factory.get('/strings', params, headers={'If-None-Match': expected['ETag']})
+        self.assertEqual(call_async_view(async_views.StringListCreateView, request).status_code, 304)
+        response = call_async_view(async_views.StringListCreateView, factory.get('/strings', {'min_length': 'x'}))
+        self.assertEqual(response.status_code, 400)
+
+        params = {'query': 'single word palindromic strings'}
+        expected = self.client.get(reverse('string-natural-language-filter'), params)
+        response = call_async_view(async_views.StringNaturalLanguageFilterView, factory.get('/strings/filter', params))
+        self.assertEqual(json.loads(response.content), json.loads(expected.content))
+
+        response = call_async_view(async_views.StringDetailView, factory.delete('/strings/racecar'), string_value='racecar')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = call_async_view(async_views.StringDetailView, factory.get('/strings/racecar'), string_value='racecar')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(ANALYZER_ASYNC_OFFLOAD_THRESHOLD=100)
+    def test_analyze_async_offloads_large_inputs(self):
+        """Test large strings are analyzed on a thread instead of the event loop."""
+        value = benchmarks.make_text(1000)
+        with mock.patch('asyncio.to_thread', wraps=engine.asyncio.to_thread) as to_thread:
+            self.assertEqual(async_to_sync(engine.analyze_async)('short'), compute_properties('short'))
+            to_thread.assert_not_called()
+            self.assertEqual(async_to_sync(engine.analyze_async)(value), compute_properties(value))
+            to_thread.assert_called_once()
+
+    def test_benchmark_settings_profiles(self):
+        """Smoke-test the settings profile benchmark, which also boots the lean API profile."""
+        results = benchmarks.benchmark_settings_profiles(requests=5)
+        self.assertEqual([row['settings'] for row in results], list(benchmarks.SETTINGS_PROFILES))
+        for row in results:
+            self.assertGreater(row['startup_seconds'], 0)
+            self.assertGreater(row['detail_request_seconds'], 0)
+
+    def test_metrics_endpoint(self):
+        """Test request latency and phase histograms are exposed in Prometheus format."""
+        metrics.registry.clear()
+        url = reverse('string-list-create')
+        self.client.post(url, {'value': 'level'}, format='json')
+        self.client.post(url, {'value': 'level'}, format='json')
+        self.client.get(url, {'min_length': '2'})
+
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        lines = response.content.decode().splitlines()
+        self.assertIn('analyzer_requests_total{endpoint="string-list-create",method="POST",status="201"} 1', lines)
+        self.assertIn('analyzer_requests_total{endpoint="string-list-create",method="POST",status="409"} 1', lines)
+        self.assertIn('analyzer_request_duration_seconds_count{endpoint="string-list-create",method="GET"} 1', lines)
+        self.assertIn('analyzer_request_duration_seconds_bucket{endpoint="string-list-create",method="POST",le="+Inf"} 2', lines)
+        for phase in ('parse', 'analyze', 'compute_properties', 'store'):
+            self.assertIn(f'analyzer_phase_duration_seconds_count{{endpoint="string-list-create",phase="{phase}"}} 2', lines)
+        self.assertIn('analyzer_phase_duration_seconds_count{endpoint="string-list-create",phase="query"} 1', lines)
+        self.assertIn('analyzer_phase_duration_seconds_count{endpoint="string-list-create",phase="render"} 3', lines)
+        self.assertIn('analyzer_strings_stored 1', lines)
+
+    def test_store_capacity_over_api(self):
+        """Test a bounded store evicts through the API and reports it in /metrics."""
+        url = reverse('string-list-create')
+        with mock.patch.object(strings_storage, 'capacity', Capacity(max_entries=2, max_bytes=10 ** 6)):
+            for value in ('one', 'two', 'three'):
+                self.assertEqual(self.client.post(url, {'value': value}, format='json').status_code, status.HTTP_201_CREATED)
+            self.assertEqual(self.client.get(reverse('string-detail', args=['one'])).status_code, status.HTTP_404_NOT_FOUND)
+            self.assertEqual(self.client.get(url).data['count'], 2)
+            lines = self.client.get(reverse('metrics')).content.decode().splitlines()
+        self.assertIn('analyzer_store_evictions_capacity 1', lines)
+        self.assertIn('analyzer_store_evictions_expired 0', lines)
+        self.assertTrue(any(line.startswith('analyzer_store_bytes ') for line in lines))
+
+    def test_export_import_round_trip(self):
+        """Test the NDJSON export re-imports into an empty store without reanalysis."""
+        url = reverse('string-list-create')
+        for value in ('level', 'Été à Paris', 'a man a plan'):
+            self.client.post(url, {'value': value}, format='json')
+        entries = list(strings_storage.values())
+        response = self.client.get(reverse('string-export'))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        body = b''.join(response.streaming_content)
+        self.assertEqual([json.loads(line) for line in body.splitlines()], entries)
+
+        strings_storage.clear()
+        with mock.patch('analyzer.engine.compute_properties') as compute:
+            response = self.client.post(reverse('string-import'), body, content_type='application/x-ndjson')
+        compute.assert_not_called()
+        self.assertEqual(response.data, {'imported': 3, 'duplicates': 0, 'invalid': 0, 'errors': []})
+        self.assertEqual(list(strings_storage.values()), entries)
+
+        response = self.client.post(reverse('string-import'), body, content_type='application/x-ndjson')
+        self.assertEqual(response.data['duplicates'], 3)
+
+    def test_import_reports_invalid_lines(self):
+        """Test invalid import lines are reported by line number and the rest imported."""
+        good = json.loads(b''.join(self._exported('good')))
+        wrong_id = dict(good, id='0' * 64)
+        wrong_length = dict(good, properties=dict(good['properties'], length=99))
+        bool_as_int = dict(good, properties=dict(good['properties'], is_palindrome=0))
+        lines = [json.dumps(wrong_id), '{"value": ', '', json.dumps(wrong_length), json.dumps(bool_as_int), json.dumps(good)]
+        strings_storage.clear()
+        response = self.client.post(reverse('string-import'), '\n'.join(lines), content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['imported'], 1)
+        self.assertEqual(response.data['invalid'], 4)
+        self.assertEqual([error['line'] for error in response.data['errors']], [1, 2, 4, 5])
+        self.assertIn('SHA-256', response.data['errors'][0]['error'])
+        self.assertEqual(strings_storage.get(good['id']), good)
+
+        response = self.client.post(reverse('string-import'), b'', content_type='application/x-ndjson')
+        self.assertEqual(response.data['imported'], 0)
+
+    def _exported(self, value):
+        self.client.post(reverse('string-list-create'), {'value': value}, format='json')
+        return self.client.get(reverse('string-export')).streaming_content
+
+    def test_change_feed(self):
+        """Test creates and deletes are listed after since, with a resync signal when out of range."""
+        url = reverse('string-changes')
+        cursor = self.client.get(url).data['last_seq']
+        epoch, since = cursor.split(':')
+        since = int(since)
+        self.assertEqual(epoch, strings_storage.epoch)
+        self.client.post(reverse('string-list-create'), {'value': 'level'}, format='json')
+        self.client.post(reverse('string-batch-create'), ['radar'], format='json')
+        self.client.delete(reverse('string-detail', args=['level']))
+
+        response = self.client.get(url, {'since': cursor})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        changes = response.data['changes']
+        self.assertEqual([(change['seq'] - since, change['op']) for change in changes], [(1, 'create'), (2, 'create'), (3, 'delete')])
+        self.assertEqual(changes[0]['entry']['value'], 'level')
+        self.assertEqual(changes[0]['id'], compute_properties('level')['sha256_hash'])
+        self.assertEqual(changes[2]['id'], changes[0]['id'])
+        self.assertEqual(response.data['last_seq'], f'{epoch}:{since + 3}')
+        self.assertFalse(response.data['resync'])
+
+        self.assertEqual(self.client.get(url, {'since': f'{epoch}:{since + 3}'}).data['changes'], [])
+        self.assertTrue(self.client.get(url, {'since': f'{epoch}:{since + 4}'}).data['resync'])
+        for params in ({'since': 'x'}, {'since': f'{epoch}:-1'}, {'since': f'{epoch}:'}, {'wait': 'soon'}):
+            self.assertEqual(self.client.get(url, params).status_code, status.HTTP_400_BAD_REQUEST)
+
+        feed = ChangeFeed(2)
+        with mock.patch.object(strings_storage, 'changes', feed):
+            for value in ('a', 'b', 'c'):
+                self.client.post(reverse('string-list-create'), {'value': value}, format='json')
+            self.assertTrue(self.client.get(url, {'since': feed.cursor(0)}).data['resync'])
+            self.assertEqual([change['seq'] for change in self.client.get(url, {'since': feed.cursor(1)}).data['changes']], [2, 3])
+
+    def test_change_feed_cursor_from_another_epoch_resyncs(self):
+        """Test cursors from before a restart resync instead of skipping the new process's changes."""
+        url = reverse('string-changes')
+        cursor = self.client.get(url).data['last_seq']
+        self.client.post(reverse('string-list-create'), {'value': 'level'}, format='json')
+        # A restart starts a new epoch, with sequence numbers counting from zero again
+        restarted = InMemoryStringStore(changes=ChangeFeed())
+        for value in ('a', 'b', 'c'):
+            restarted.add(views.build_entry(value, compute_properties(value)))
+        with mock.patch.object(views, 'strings_storage', restarted):
+            for since in (cursor, '0', cursor.split(':')[1]):
+                response = self.client.get(url, {'since': since})
+                self.assertTrue(response.data['resync'], since)
+                self.assertEqual(response.data['last_seq'], f'{restarted.epoch}:3')
+            response = self.client.get(url, HTTP_ACCEPT='text/event-stream', HTTP_LAST_EVENT_ID=cursor)
+            events = list(response.streaming_content)
+        self.assertEqual(events[1:], [f'event: resync\ndata: {{"last_seq":"{restarted.epoch}:3"}}\n\n'.encode()])
+
+    def test_change_feed_long_poll_and_event_stream(self):
+        """Test a waiting request wakes up on the next change, and the SSE stream carries it."""
+        url = reverse('string-changes')
+        since = strings_storage.changes.last_seq
+        cursor = strings_storage.changes.cursor()
+        timer = threading.Timer(0.2, lambda: strings_storage.add(views.build_entry('noon', compute_properties('noon'))))
+        timer.start()
+        started = time.monotonic()
+        response = self.client.get(url, {'since': cursor, 'wait': '10'})
+        timer.join()
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(response.data['changes'][0]['entry']['value'], 'noon')
+
+        response = self.client.get(url, HTTP_ACCEPT='text/event-stream', HTTP_LAST_EVENT_ID=cursor)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = iter(response.streaming_content)
+        self.assertEqual(next(events), b'retry: 1000\n\n')
+        event = next(events).decode()
+        response.close()
+        self.assertTrue(event.startswith(f'id: {strings_storage.epoch}:{since + 1}\nevent: create\ndata: '))
+        self.assertEqual(json.loads(event.split('data: ', 1)[1])['entry']['value'], 'noon')
+
+        stream = changes.event_stream(strings_storage.changes, (strings_storage.epoch, since + 5))
+        self.assertEqual(list(stream)[1:], [f'event: resync\ndata: {{"last_seq":"{strings_storage.epoch}:{since + 1}"}}\n\n'.encode()])
+        self.assertEqual(self.client.get(url, {'since': 'x'}, HTTP_ACCEPT='text/event-stream').content, b'event: error\ndata: {"error":"Invalid since"}\n\n')
+
+    def test_async_store_calls_do_not_wait_on_the_loop(self):
+        """Test async views hand store calls to a thread while a writer holds the store lock."""
+        seed_storage(3)
+        locked, release = threading.Event(), threading.Event()
+
+        def writer():
+            with strings_storage._lock:
+                locked.set()
+                release.wait(5)
+
+        async def query_while_locked():
+            task = asyncio.ensure_future(async_views.call_store(strings_storage.query, {}))
+            await asyncio.sleep(0.05)
+            # The loop kept running; the query is waiting for the lock on a worker thread
+            self.assertFalse(task.done())
+            release.set()
+            return await task
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        locked.wait(5)
+        page = async_to_sync(query_while_locked)()
+        thread.join()
+        self.assertEqual(page.count, 3)
+
+    def test_async_wait_survives_racing_append_and_cancellation(self):
+        """Test a change landing as a long-poll times out, and a dropped client, leave no stale waiters."""
+        feed = ChangeFeed()
+        wait = asyncio.wait
+
+        async def wait_then_append(futures, timeout):
+            done = await wait(futures, timeout=timeout)
+            # append() takes the waiter before its _resolve callback can run on this loop
+            feed.append(changes.CLEAR)
+            return done
+
+        with mock.patch.object(changes.asyncio, 'wait', wait_then_append):
+            found, last_seq = async_to_sync(feed.wait_async)(feed.now(), 0.01)
+        self.assertEqual(([change.op for change in found], last_seq), (['clear'], 1))
+        self.assertEqual(feed._futures, [])
+
+        async def cancelled_wait():
+            task = asyncio.ensure_future(feed.wait_async(feed.now(), 10))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        async_to_sync(cancelled_wait)()
+        self.assertEqual(feed._futures, [])
+
+    def test_async_change_feed(self):
+        """Test the async change feed waits on the event loop and streams events."""
+        factory = AsyncRequestFactory()
+        since = strings_storage.changes.cursor()
+        timer = threading.Timer(0.2, lambda: strings_storage.add(views.build_entry('kayak', compute_properties('kayak'))))
+        timer.start()
+        response = call_async_view(async_views.StringChangesView, factory.get('/strings/changes', {'since': since, 'wait': '10'}))
+        timer.join()
+        body = json.loads(response.content)
+        self.assertEqual([change['entry']['value'] for change in body['changes']], ['kayak'])
+
+        async def first_events(response, count):
+            events = []
+            async for event in response:
+                events.append(event)
+                if len(events) == count:
+                    break
+            return events
+
+        request = factory.get('/strings/changes', {'since': since}, headers={'Accept': 'text/event-stream'})
+        response = call_async_view(async_views.StringChangesView, request)
+        self.assertTrue(response.is_async)
+        events = async_to_sync(first_events)(response.streaming_content, 2)
+        self.assertIn(b'"value":"kayak"', events[1])
+
+    def test_string_larger_than_byte_budget_is_refused(self):
+        """Test a string bigger than the whole byte budget is refused instead of emptying the store."""
+        url = reverse('string-list-create')
+        big = 'x' * 199 + 'y'
+        with mock.patch.object(strings_storage, 'capacity', Capacity(max_bytes=5000)):
+            self.assertEqual(self.client.post(url, {'value': 'level'}, format='json').status_code, status.HTTP_201_CREATED)
+            response = self.client.post(url, {'value': big}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            self.assertIn('error', response.data)
+
+            request = AsyncRequestFactory().post('/strings', {'value': big}, content_type='application/json')
+            self.assertEqual(call_async_view(async_views.StringListCreateView, request).status_code, 413)
+
+            response = self.client.post(reverse('string-batch-create'), [big, 'noon', 'level'], format='json')
+            self.assertEqual([result['status'] for result in response.data['results']], [413, 201, 409])
+            self.assertEqual((response.data['created'], response.data['duplicates'], response.data['invalid']), (1, 1, 1))
+
+            line = json.dumps(views.build_entry(big, compute_properties(big)))
+            response = self.client.post(reverse('string-import'), line + '\n', content_type='application/x-ndjson')
+            self.assertEqual((response.data['imported'], response.data['invalid']), (0, 1))
+            self.assertEqual(response.data['errors'][0]['line'], 1)
+            self.assertEqual(len(strings_storage), 2)
+
+    def test_ttl_expiry_reaches_cached_listings_and_etags(self):
+        """Test expired entries leave cached listings, listing ETags and detail 304s."""
+        url = reverse('string-list-create')
+        with mock.patch.object(strings_storage, 'capacity', Capacity(ttl=60)):
+            self.client.post(url, {'value': 'level'}, format='json')
+            listing = self.client.get(url)
+            detail = self.client.get(reverse('string-detail', args=['level']))
+            self.assertEqual(listing.data['count'], 1)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=listing['ETag']).status_code, status.HTTP_304_NOT_MODIFIED)
+
+            later = eviction.now_micros() + 61 * 1000000
+            with mock.patch('analyzer.storage.now_micros', return_value=later):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=listing['ETag'])
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response.data['count'], 0)
+                self.assertNotEqual(response['ETag'], listing['ETag'])
+                response = self.client.get(reverse('string-detail', args=['level']), HTTP_IF_NONE_MATCH=detail['ETag'])
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_expired_entry_is_refused_before_it_reaches_the_front(self):
+        """Test an entry past its own TTL is refused even behind newer ones."""
+        url = reverse('string-list-create')
+        with mock.patch.object(strings_storage, 'capacity', Capacity(ttl=60)):
+            self.client.post(url, {'value': 'fresh'}, format='json')
+            old = views.build_entry('stale', compute_properties('stale'))
+            old['created_at'] = '2020-01-01T00:00:00Z'
+            strings_storage.add(old)
+            self.assertNotIn(old['id'], strings_storage)
+            self.assertEqual(self.client.get(reverse('string-detail', args=['stale'])).status_code, status.HTTP_404_NOT_FOUND)
+            self.assertEqual(self.client.get(url).data['count'], 1)
+            self.assertEqual(strings_storage.capacity.evictions['expired'], 1)
+
+    def test_metrics_histogram_buckets_are_cumulative(self):
+        registry = metrics.MetricsRegistry(buckets=(0.1, 1.0))
+        for seconds in (0.05, 0.1, 0.5, 2.0):
+            registry.observe_request('detail', 'GET', 200, seconds, {'store': seconds / 2})
+        lines = registry.render().splitlines()
+        self.assertIn('analyzer_request_duration_seconds_bucket{endpoint="detail",method="GET",le="0.1"} 2', lines)
+        self.assertIn('analyzer_request_duration_seconds_bucket{endpoint="detail",method="GET",le="1.0"} 3', lines)
+        self.assertIn('analyzer_request_duration_seconds_bucket{endpoint="detail",method="GET",le="+Inf"} 4', lines)
+        self.assertIn('analyzer_request_duration_seconds_sum{endpoint="detail",method="GET"} 2.65', lines)
+        self.assertIn('analyzer_phase_duration_seconds_bucket{endpoint="detail",phase="store",le="0.1"} 2', lines)
+
+    def test_nested_phases_do_not_overlap(self):
+        """Test time in a nested phase counts toward it alone, not also toward the phases around it."""
+        inner = metrics.timed('hash')(lambda: None)
+        token = metrics.start_phases()
+        with mock.patch.object(metrics.time, 'perf_counter', side_effect=[0.0, 1.0, 3.0, 4.0, 4.5, 10.0]):
+            with metrics.timed('analyze'):
+                inner()
+                with metrics.timed('compute_properties'):
+                    pass
+        self.assertEqual(metrics.finish_phases(token), {'hash': 2.0, 'compute_properties': 0.5, 'analyze': 7.5})
+        # Outside a request nothing is timed
+        with metrics.timed('analyze'):
+            inner()
+
+    def test_sampling_profiler_dumps_stats(self):
+        """Test one request in N is profiled and its stats written to disk."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(ANALYZER_PROFILE_EVERY=2, ANALYZER_PROFILE_DIR=directory):
+            client = APIClient()
+            for _ in range(4):
+                client.get(reverse('string-list-create'))
+        dumps = sorted(os.listdir(directory))
+        self.assertEqual(len(dumps), 2)
+        self.assertTrue(all(name.startswith('string-list-create-') and name.endswith('.prof') for name in dumps))
+        stats = pstats.Stats(os.path.join(directory, dumps[0]))
+        self.assertTrue(any(function[2] == 'get' for function in stats.stats))
+
+    def test_benchmark_corpus_is_reproducible(self):
+        corpus = apibench.make_corpus(300, 'uniform', 1, 30, seed=7)
+        self.assertEqual(corpus, apibench.make_corpus(300, 'uniform', 1, 30, seed=7))
+        self.assertEqual(len(set(corpus)), 300)
+        self.assertNotEqual(corpus, apibench.make_corpus(300, 'uniform', 1, 30, seed=8))
+        for distribution in apibench.DISTRIBUTIONS:
+            lengths = apibench.make_lengths(apibench.random.Random(0), 200, distribution, 5, 50)
+            self.assertTrue(all(5 <= length <= 50 for length in lengths), distribution)
+
+    def test_benchmark_command_client_target(self):
+        """Smoke-test manage.py benchmark in process; it must leave the real store alone."""
+        seed_storage(3)
+        stdout = StringIO()
+        call_command('benchmark', '--corpus-size', '50', '--requests', '10', stdout=stdout)
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(report['parameters']['target'], 'client')
+        self.assertEqual(sorted(report['results']), sorted(['seed', *apibench.SCENARIOS]))
+        expected = {'create': '201', 'detail': '200', 'list': '200', 'nl': '200', 'delete': '204'}
+        for scenario, code in expected.items():
+            self.assertEqual(report['results'][scenario]['statuses'], {code: 10}, scenario)
+            self.assertIsNotNone(report['results'][scenario]['p99_ms'])
+        self.assertEqual(len(strings_storage), 3)
+
+        comparison = apibench.compare(report, report)
+        self.assertEqual(comparison['detail']['p50_ms'], 1.0)
+
+    @skipUnless(importlib.util.find_spec('gunicorn'), 'gunicorn is not installed')
+    def test_benchmark_gunicorn_target(self):
+        report = apibench.run_benchmark(target='gunicorn', corpus_size=20, requests=5, scenarios=('detail', 'list'))
+        self.assertEqual(report['results']['detail']['statuses'], {'200': 5})
+        self.assertEqual(report['results']['list']['errors'], 0)
+
+
+class StoreBackendTestsMixin:
+    """Behaviour every storage backend must share."""
+
+    def make_store(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.store = self.make_store()
+        self.entries = list(benchmarks.make_entries(6))
+
+    def test_add_get_pop(self):
+        entry = self.entries[0]
+        self.assertTrue(self.store.add(entry))
+        self.assertFalse(self.store.add(entry))
+        self.assertIn(entry['id'], self.store)
+        self.assertEqual(self.store.get(entry['id']), entry)
+        self.assertEqual(len(self.store), 1)
+        self.assertEqual(self.store.pop(entry['id']), entry)
+        self.assertIsNone(self.store.pop(entry['id']))
+        self.assertIsNone(self.store.get(entry['id']))
+        self.assertEqual(len(self.store), 0)
+
+    def test_query_filters_and_pages(self):
+        self.assertEqual(self.store.add_many(self.entries + self.entries[:1]), [True] * 6 + [False])
+        page = self.store.query({'min_length': 10, 'contains_character': 'l'})
+        expected = [entry for entry in self.entries if entry['properties']['length'] >= 10 and 'l' in entry['value']]
+        self.assertEqual(page.entries, expected)
+        self.assertEqual(page.count, len(expected))
+
+        seen = []
+        after = None
+        while True:
+            page = self.store.query({}, after=after, limit=4)
+            seen.extend(page.entries)
+            if page.next_seq is None:
+                break
+            after = page.next_seq
+        self.assertEqual(seen, self.entries)
+        self.assertEqual(list(self.store.values()), self.entries)
+
+        self.store.clear()
+        self.assertEqual(self.store.query({}).count, 0)
+
+    def test_lazy_query_matches_eager_query(self):
+        self.store.add_many(self.entries)
+        after = self.store.query({}, limit=2).next_seq
+        for filters, after, limit in [({}, None, 3), ({}, None, 6), ({}, after, 3), ({'word_count': 2}, None, None)]:
+            eager = self.store.query(filters, after=after, limit=limit, encoded=True)
+            lazy = self.store.query(filters, after=after, limit=limit, encoded=True, lazy=True)
+            self.assertNotIsInstance(lazy.entries, list)
+            self.assertEqual((list(lazy.entries), lazy.count, lazy.next_seq), tuple(eager))
+
+    def test_query_fields_and_encoded(self):
+        self.store.add_many(self.entries)
+        fields = ('id', 'properties.word_count')
+        page = self.store.query({}, limit=2, fields=fields)
+        self.assertEqual(page.entries, [
+            {'id': entry['id'], 'properties': {'word_count': entry['properties']['word_count']}}
+            for entry in self.entries[:2]
+        ])
+        encoded = self.store.query({}, limit=2, encoded=True)
+        self.assertEqual([json.loads(entry) for entry in encoded.entries], self.entries[:2])
+        encoded = self.store.query({}, limit=2, fields=fields, encoded=True)
+        self.assertEqual([json.loads(entry) for entry in encoded.entries], page.entries)
+
+    def test_export_and_import(self):
+        self.store.add_many(self.entries)
+        self.store.pop(self.entries[1]['id'])
+        lines = b''.join(transfer.export_chunks(self.store, chunk_bytes=200)).splitlines()
+        remaining = [entry for entry in self.entries if entry is not self.entries[1]]
+        self.assertEqual([json.loads(line) for line in lines], remaining)
+
+        self.store.clear()
+        summary = transfer.import_lines(self.store, lines + lines[:1], chunk_size=2)
+        self.assertEqual(summary, {'imported': 5, 'duplicates': 1, 'invalid': 0, 'errors': []})
+        self.assertEqual(list(self.store.values()), remaining)
+
+    def test_contains_character_matches_quotes_and_case(self):
+        entries = [views.build_entry(value, compute_properties(value)) for value in ('say "hi"', "it's", 'back\\slash', 'Abc')]
+        self.store.add_many(entries)
+        for char, expected in (('"', [0]), ("'", [1]), ('\\', [2]), ('A', [3]), ('a', [0, 2])):
+            values = [entry['value'] for entry in self.store.query({'contains_character': char}).entries]
+            self.assertEqual(values, [entries[i]['value'] for i in expected], char)
+
+    def test_stats_match_recomputed_aggregates(self):
+        self.store.add_many(self.entries)
+        self.store.pop(self.entries[2]['id'])
+        remaining = [entry for entry in self.entries if entry is not self.entries[2]]
+        expected = CorpusStats.from_records(map(StringRecord.from_entry, remaining)).as_dict()
+        self.assertEqual(self.store.stats(), expected)
+
+        filters = {'min_length': 10, 'contains': 'ch'}
+        matching = self.store.query(filters).entries
+        expected = CorpusStats.from_records(map(StringRecord.from_entry, matching)).as_dict()
+        self.assertEqual(self.store.stats(filters), expected)
+        self.store.clear()
+        self.assertEqual(self.store.stats()['count'], 0)
+
+
+class InMemoryStringStoreTestCase(StoreBackendTestsMixin, TestCase):
+    def make_store(self):
+        return InMemoryStringStore()
+
+    def test_unfiltered_pages_walk_the_store_without_copying_it(self):
+        """Test unfiltered pages and streams skip to their cursor without a snapshot of every record."""
+        entries = list(benchmarks.make_entries(60))
+        self.store.add_many(entries)
+        for entry in entries[5:40:3] + entries[:2]:
+            self.store.pop(entry['id'])
+        expected = list(self.store.values())
+        with mock.patch.object(InMemoryStringStore, '_select', side_effect=AssertionError('copied the store')):
+            seen, after = [], None
+            while True:
+                page = self.store.query({}, after=after, limit=7)
+                self.assertEqual(page.count, len(expected))
+                seen.extend(page.entries)
+                if page.next_seq is None:
+                    break
+                after = page.next_seq
+            self.assertEqual(seen, expected)
+
+            with mock.patch('analyzer.storage.EXPORT_PAGE_SIZE', 4):
+                page = self.store.query({}, after=self.store.query({}, limit=10).next_seq, lazy=True)
+                self.assertEqual(list(page.entries), expected[10:])
+                # A stream stops at the records that existed when it started
+                streamed = self.store.query({}, lazy=True).entries
+                self.assertEqual(next(streamed), expected[0])
+                self.store.add(next(benchmarks.make_entries(1, prefix='later')))
+                self.assertEqual(list(streamed), expected[1:])
+
+    def make_bounded_store(self, **limits):
+        store = self.make_store()
+        store.capacity = Capacity(**limits)
+        return store
+
+    def test_fifo_eviction_keeps_newest_entries(self):
+        store = self.make_bounded_store(max_entries=3, policy='fifo')
+        store.add_many(self.entries[:5])
+        store.get(self.entries[2]['id'])
+        store.add(self.entries[5])
+        self.assertEqual(list(store.values()), self.entries[3:])
+        self.assertEqual(store.query({}).count, 3)
+        self.assertEqual(store.stats()['count'], 3)
+        self.assertEqual(store.capacity.evictions, {'capacity': 3, 'expired': 0})
+
+    def test_lru_eviction_spares_recently_read_entries(self):
+        store = self.make_bounded_store(max_entries=3)
+        store.add_many(self.entries[:3])
+        store.get(self.entries[0]['id'])
+        store.add(self.entries[3])
+        self.assertIsNone(store.get(self.entries[1]['id']))
+        self.assertEqual([entry['id'] for entry in store.values()], [self.entries[i]['id'] for i in (0, 2, 3)])
+
+        store.pop(self.entries[2]['id'])
+        store.add_many(self.entries[4:])
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store.capacity.evictions['capacity'], 2)
+
+    def test_byte_budget_bounds_store(self):
+        budget = sum(map(eviction.footprint, map(StringRecord.from_entry, self.entries[:2])))
+        store = self.make_bounded_store(max_bytes=budget + 1)
+        store.add_many(self.entries)
+        self.assertLessEqual(store.capacity.bytes, budget + 1)
+        self.assertEqual(store.capacity.bytes, sum(map(eviction.footprint, store._records.values())))
+        self.assertEqual(list(store.values()), self.entries[-len(store):])
+        # Sizing a record must not cache its encoding
+        self.assertTrue(all(record.encoded is None for record in store._records.values()))
+        store.clear()
+        self.assertEqual(store.capacity.bytes, 0)
+
+    def test_entries_expire_after_ttl(self):
+        created = StringRecord.from_entry(self.entries[0]).created
+        store = self.make_bounded_store(ttl=60)
+        with mock.patch('analyzer.storage.now_micros', return_value=created + 30 * 1000000):
+            store.add_many(self.entries[:3])
+            self.assertEqual(store.get(self.entries[0]['id']), self.entries[0])
+        with mock.patch('analyzer.storage.now_micros', return_value=created + 61 * 1000000):
+            self.assertIsNone(store.get(self.entries[1]['id']))
+            self.assertEqual(store.query({}).count, 0)
+        self.assertEqual(store.capacity.evictions, {'capacity': 0, 'expired': 3})
+
+    def test_evictions_are_logged(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        store = InMemoryStringStore(log=AppendOnlyLog(directory), capacity=Capacity(max_entries=2))
+        store.add_many(self.entries[:4])
+        store.log.close()
+        restored = InMemoryStringStore(log=AppendOnlyLog(directory))
+        self.assertEqual(list(restored.values()), self.entries[2:4])
+        restored.log.close()
+
+        restored = InMemoryStringStore(log=AppendOnlyLog(directory), capacity=Capacity(max_entries=1, policy='fifo'))
+        self.assertEqual(list(restored.values()), self.entries[3:4])
+        restored.log.close()
+
+    def test_concurrent_writers_and_readers(self):
+        """Test racing inserts, deletes and reads from many threads leave the store consistent."""
+        entries = list(benchmarks.make_entries(400))
+        created = [0] * len(entries)
+        errors = []
+        done = threading.Event()
+        barrier = threading.Barrier(8)
+
+        def writer(offset):
+            barrier.wait()
+            # Every writer tries every entry, so each one is contended
+            for position in range(len(entries)):
+                position = (position + offset * 50) % len(entries)
+                if self.store.add(entries[position]):
+                    created[position] += 1
+                if position % 3 == 0:
+                    self.store.pop(entries[position]['id'])
+
+        def reader():
+            barrier.wait()
+            while not done.is_set():
+                page = self.store.query({'min_length': 5, 'contains': 'ch'}, limit=50)
+                for entry in page.entries:
+                    if entry['properties']['length'] < 5 or 'ch' not in entry['value']:
+                        errors.append(entry['id'])
+                self.store.stats({'word_count': 3})
+                list(self.store.values())
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        # Exceptions raised inside the threads fail the test too
+        excepthook = mock.patch.object(threading, 'excepthook', lambda args: errors.append(args.exc_value))
+        try:
+            excepthook.start()
+            writers = [threading.Thread(target=writer, args=(number,)) for number in range(6)]
+            readers = [threading.Thread(target=reader) for _ in range(2)]
+            for thread in writers + readers:
+                thread.start()
+            for thread in writers:
+                thread.join()
+            done.set()
+            for thread in readers:
+                thread.join()
+        finally:
+            excepthook.stop()
+            sys.setswitchinterval(interval)
+
+        self.assertEqual(errors, [])
+        kept = [position for position in range(len(entries)) if position % 3]
+        # Entries never deleted were created exactly once despite six writers
+        self.assertTrue(all(created[position] == 1 for position in kept))
+        stored = {entry['id'] for entry in self.store.values()}
+        self.assertTrue(stored.issuperset(entries[position]['id'] for position in kept))
+        self.assertEqual(self.store.query({'min_length': 0}).count, len(stored))
+        self.assertEqual(self.store.stats()['count'], len(stored))
+        expected = CorpusStats.from_records(map(StringRecord.from_entry, self.store.values())).as_dict()
+        self.assertEqual(self.store.stats(), expected)
+
+    def test_concurrent_duplicate_posts(self):
+        """Test simultaneous POSTs of one value yield a single 201."""
+        barrier = threading.Barrier(8)
+        statuses = []
+
+        def post():
+            client = APIClient()
+            barrier.wait()
+            statuses.append(client.post(reverse('string-list-create'), {'value': 'race me'}, format='json').status_code)
+
+        with mock.patch.object(views, 'strings_storage', self.store):
+            threads = [threading.Thread(target=post) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(sorted(statuses), [201] + [409] * 7)
+
+
+class ColumnarInMemoryStringStoreTestCase(InMemoryStringStoreTestCase):
+    def make_store(self):
+        return InMemoryStringStore(columnar=True)
+
+    def _check_matches_index(self):
+        indexed = InMemoryStringStore()
+        for entry in self.store.values():
+            indexed.add(entry)
+        for filters in ({'min_length': 12, 'max_length': 40}, {'word_count': 4, 'is_palindrome': False},
+                        {'max_length': 30, 'contains_character': 'r'}, {'is_palindrome': True}):
+            self.assertEqual(self.store.query(filters).entries, indexed.query(filters).entries, filters)
+
+    def test_columnar_matches_index_after_compaction(self):
+        """Test vectorized and pure Python column scans agree with the indexes."""
+        entries = list(benchmarks.make_entries(300))
+        self.store.add_many(entries)
+        with mock.patch.object(columnar, 'MIN_COMPACT_ROWS', 10):
+            for entry in entries[::3] + entries[1::3]:
+                self.store.pop(entry['id'])
+        self.assertEqual(len(self.store.columns), 100)
+        self.assertLess(len(self.store.columns.alive), 200)
+
+        self._check_matches_index()
+        with mock.patch.object(columnar, 'numpy', None):
+            self._check_matches_index()
+
+    @override_settings(ANALYZER_COLUMNAR=True, ANALYZER_DATA_DIR=None)
+    def test_columnar_setting_requires_numpy(self):
+        with mock.patch.object(columnar, 'numpy', None):
+            with self.assertRaises(ImproperlyConfigured):
+                InMemoryStringStore.from_settings()
+        with mock.patch.object(columnar, 'numpy', object()):
+            self.assertIsNotNone(InMemoryStringStore.from_settings().columns)
+
+    def test_benchmark_filter_engines(self):
+        """Smoke-test the filter engine benchmark at a small size."""
+        [result] = benchmarks.benchmark_filter_engines(sizes=(500,), repeats=1)
+        matches = benchmarks.scan_records(
+            (StringRecord.from_entry(entry) for entry in benchmarks.make_entries(500)),
+            benchmarks.FILTER_ENGINE_QUERY,
+        )
+        self.assertEqual(result['matches'], len(matches))
+
+
+class DatabaseStringStoreTestCase(StoreBackendTestsMixin, TestCase):
+    def make_store(self):
+        return DatabaseStringStore()
+
+    def test_api_on_database_backend(self):
+        """Test the endpoints keep their 201/409/404 semantics on the shared backend."""
+        with mock.patch.object(views, 'strings_storage', self.store):
+            url = reverse('string-list-create')
+            self.assertEqual(self.client.post(url, {'value': 'radar'}, content_type='application/json').status_code, 201)
+            self.assertEqual(self.client.post(url, {'value': 'radar'}, content_type='application/json').status_code, 409)
+            response = self.client.get(url, {'is_palindrome': 'true'})
+            self.assertEqual(response.json()['count'], 1)
+            detail = reverse('string-detail', kwargs={'string_value': 'radar'})
+            self.assertEqual(self.client.get(detail).json()['value'], 'radar')
+            self.assertEqual(self.client.delete(detail).status_code, 204)
+            self.assertEqual(self.client.get(detail).status_code, 404)
+
+    def test_change_feed_needs_in_memory_backend(self):
+        with mock.patch.object(views, 'strings_storage', self.store):
+            self.assertEqual(self.client.get(reverse('string-changes')).status_code, 501)
+
+    def test_async_views_on_database_backend(self):
+        """Test the async views reach the database through a worker thread."""
+        factory = AsyncRequestFactory()
+        with mock.patch.object(views, 'strings_storage', self.store):
+            request = factory.post('/strings', {'value': 'radar'}, content_type='application/json')
+            self.assertEqual(call_async_view(async_views.StringListCreateView, request).status_code, 201)
+            response = call_async_view(async_views.StringListCreateView, factory.get('/strings', {'is_palindrome': 'true'}))
+            self.assertEqual(json.loads(response.content)['count'], 1)
+            response = call_async_view(async_views.StringDetailView, factory.get('/strings/radar'), string_value='radar')
+            self.assertEqual(json.loads(response.content)['value'], 'radar')
+
+    def test_contains_is_case_sensitive(self):
+        self.store.add_many(self.entries)
+        self.assertEqual(self.store.query({'contains': 'ch 4'}).entries, [self.entries[4]])
+        self.assertEqual(self.store.query({'contains': 'bench'}).count, 6)
+        self.assertEqual(self.store.query({'contains': 'BENCH'}).entries, [])
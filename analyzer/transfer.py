@@ -0,0 +1,134 @@
+"""NDJSON export and import of whole stores, for backups and migrations.
+
+Exported lines are the stored entries exactly as the API returns them,
+properties and created_at included. Importing them checks each entry's
+hash and property shapes but trusts the properties instead of recomputing
+them, so moving a large corpus costs roughly the I/O plus one SHA-256 per
+entry. Both directions work on bounded chunks, never the whole corpus.
+"""
+import json
+from collections import Counter
+
+from .records import timestamp_to_micros
+from .utils import compute_hash
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+# Exported lines are flushed to the client in chunks of about this many bytes
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+# Imported entries are handed to the store this many at a time
+IMPORT_CHUNK_SIZE = 1000
+
+# Only the first errors are reported back, so a bad file cannot bloat the response
+MAX_REPORTED_ERRORS = 100
+
+# Scalar properties every imported entry must carry, with their JSON types
+SCALAR_PROPERTIES = (
+    ('length', int), ('is_palindrome', bool), ('unique_characters', int), ('word_count', int),
+)
+
+
+class EntryError(ValueError):
+    """Raised when an imported line is not a valid stored entry."""
+
+
+def export_chunks(store, chunk_bytes=EXPORT_CHUNK_BYTES):
+    """Yield the store's entries as NDJSON, in sequence order and in chunks of about chunk_bytes."""
+    buffer = []
+    size = 0
+    for line in store.export():
+        buffer.append(line)
+        size += len(line) + 1
+        if size >= chunk_bytes:
+            yield b'\n'.join(buffer) + b'\n'
+            buffer = []
+            size = 0
+    if buffer:
+        yield b'\n'.join(buffer) + b'\n'
+
+
+def validate_entry(entry):
+    """Return entry in the shape the stores expect, or raise EntryError."""
+    if not isinstance(entry, dict):
+        raise EntryError('Expected a JSON object')
+    value = entry.get('value')
+    if not isinstance(value, str) or not value:
+        raise EntryError('"value" must be a non-empty string')
+    entry_id = compute_hash(value)
+    if entry.get('id') != entry_id:
+        raise EntryError('"id" is not the SHA-256 hash of "value"')
+
+    props = entry.get('properties')
+    if not isinstance(props, dict):
+        raise EntryError('"properties" must be an object')
+    properties = {}
+    for name, kind in SCALAR_PROPERTIES:
+        # bool is an int subclass, so compare types exactly
+        if type(props.get(name)) is not kind:
+            raise EntryError(f'"properties.{name}" must be {"a boolean" if kind is bool else "an integer"}')
+        properties[name] = props[name]
+    if properties['length'] != len(value):
+        raise EntryError('"properties.length" does not match "value"')
+    if props.get('sha256_hash', entry_id) != entry_id:
+        raise EntryError('"properties.sha256_hash" does not match "id"')
+    frequency_map = props.get('character_frequency_map')
+    if frequency_map is None:
+        frequency_map = dict(Counter(value))
+    elif not isinstance(frequency_map, dict):
+        raise EntryError('"properties.character_frequency_map" must be an object')
+    properties['sha256_hash'] = entry_id
+    properties['character_frequency_map'] = frequency_map
+
+    created_at = entry.get('created_at')
+    try:
+        timestamp_to_micros(created_at)
+    except (TypeError, ValueError):
+        raise EntryError('"created_at" must be an ISO 8601 timestamp')
+    return {'id': entry_id, 'value': value, 'properties': properties, 'created_at': created_at}
+
+
+def import_lines(store, lines, chunk_size=IMPORT_CHUNK_SIZE):
+    """Insert the entries in an iterable of NDJSON lines; return a summary.
+
+    Blank lines are skipped; invalid ones, and entries too large for the
+    store, are counted and the first MAX_REPORTED_ERRORS reported with their
+    line numbers, while the rest of the stream is still imported.
+    """
+    summary = {'imported': 0, 'duplicates': 0, 'invalid': 0, 'errors': []}
+    chunk = []
+    numbers = []
+
+    def report(number, error):
+        summary['invalid'] += 1
+        if len(summary['errors']) < MAX_REPORTED_ERRORS:
+            summary['errors'].append({'line': number, 'error': error})
+
+    def flush():
+        added = store.add_many(chunk)
+        summary['imported'] += added.count(True)
+        summary['duplicates'] += added.count(False)
+        for number, was_added in zip(numbers, added):
+            if was_added is None:
+                report(number, "Entry is larger than the store's byte budget")
+        chunk.clear()
+        numbers.clear()
+
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            try:
+                entry = json.loads(line)
+            except ValueError as exc:
+                raise EntryError(f'Invalid JSON - {exc}')
+            chunk.append(validate_entry(entry))
+        except EntryError as exc:
+            report(number, str(exc))
+            continue
+        numbers.append(number)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    return summary
@@ -1,9 +1,19 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Native async handlers for the hot endpoints when serving over ASGI
+handlers = async_views if getattr(settings, 'ANALYZER_ASYNC_VIEWS', False) else views
 
 urlpatterns = [
-    path('strings', views.StringListCreateView.as_view(), name='string-list-create'),
-    path('strings/filter-by-natural-language', views.StringNaturalLanguageFilterView.as_view(), name='string-natural-language-filter'),
-    path('strings/<str:string_value>', views.StringDetailView.as_view(), name='string-detail'),
-    
+    path('strings', handlers.StringListCreateView.as_view(), name='string-list-create'),
+    path('strings/batch', views.StringBatchCreateView.as_view(), name='string-batch-create'),
+    path('strings/filter-by-natural-language', handlers.StringNaturalLanguageFilterView.as_view(), name='string-natural-language-filter'),
+    path('strings/stats', views.StringStatsView.as_view(), name='string-stats'),
+    path('strings/export', views.StringExportView.as_view(), name='string-export'),
+    path('strings/import', views.StringImportView.as_view(), name='string-import'),
+    path('strings/changes', handlers.StringChangesView.as_view(), name='string-changes'),
+    path('strings/<str:string_value>', handlers.StringDetailView.as_view(), name='string-detail'),
+    path('cache-stats', views.QueryCacheStatsView.as_view(), name='query-cache-stats'),
+    path('metrics', views.MetricsView.as_view(), name='metrics'),
 ]
@@ -1,20 +1,51 @@
 import hashlib
+import json
 import re
 from collections import Counter
 
+from .metrics import timed
+
+# Encoded strings are fed to SHA-256 in slices of this many bytes
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def encode_json(obj):
+    """Encode obj to UTF-8 JSON bytes exactly as DRF's JSONRenderer does."""
+    text = json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+    # Line and paragraph separators are valid JSON but not valid JavaScript
+    return text.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode()
+
+
+def _sha256_hexdigest(data):
+    digest = hashlib.sha256()
+    view = memoryview(data)
+    for start in range(0, len(view), HASH_CHUNK_SIZE):
+        digest.update(view[start:start + HASH_CHUNK_SIZE])
+    return digest.hexdigest()
+
+
+@timed('hash')
+def compute_hash(value):
+    """Return the SHA-256 hex digest used as the id of a string."""
+    return _sha256_hexdigest(value.encode())
+
+
+def is_palindrome(value):
+    """Case-insensitive palindrome check comparing the two halves of one lowered copy."""
+    lowered = value.lower()
+    half = len(lowered) // 2
+    return lowered[:half] == lowered[:-half - 1:-1]
+
+
+@timed('compute_properties')
 def compute_properties(value):
     """Compute all required properties for a string."""
-    length = len(value)
-    is_palindrome = value.lower() == value.lower()[::-1]
-    unique_characters = len(set(value))
-    word_count = len(value.split())
-    sha256_hash = hashlib.sha256(value.encode()).hexdigest()
-    character_frequency_map = dict(Counter(value))
+    frequencies = Counter(value)
     return {
-        'length': length,
-        'is_palindrome': is_palindrome,
-        'unique_characters': unique_characters,
-        'word_count': word_count,
-        'sha256_hash': sha256_hash,
-        'character_frequency_map': character_frequency_map,
-    }
\ No newline at end of file
+        'length': len(value),
+        'is_palindrome': is_palindrome(value),
+        'unique_characters': len(frequencies),
+        'word_count': len(value.split()),
+        'sha256_hash': compute_hash(value),
+        'character_frequency_map': dict(frequencies),
+    }
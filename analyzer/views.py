@@ -1,148 +1,319 @@
-import re
+from collections.abc import Iterator
 from datetime import datetime
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.http import Http404
-from .utils import compute_properties
+from rest_framework.parsers import JSONParser
+from rest_framework.settings import api_settings
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from .cache import build_query_cache
+from .changes import (
+    EVENT_STREAM_CONTENT_TYPE, ChangeFeedError, changes_response_data, event_stream, parse_changes_params,
+)
+from .engine import analyze, analyze_many
+from .etags import entry_etag, listing_etag, not_modified
+from .eviction import EntryTooLarge
+from .filters import FilterError, parse_fields, parse_filters
+from .metrics import registry, timed
+from .nlquery import QueryConflictError, QueryError, parse_query
+from .pagination import (
+    PaginationError, PreEncodedResponse, encode_listing, next_cursor, parse_page_params, stream_listing, wants_stream,
+)
+from .parsers import NDJSONParser
+from .renderers import EventStreamRenderer
+from .storage import build_store
+from .transfer import NDJSON_CONTENT_TYPE, export_chunks, import_lines
+from .utils import compute_hash
 
-# In-memory storage: dict with sha256_hash as key
-strings_storage = {}
+# Storage keyed by sha256_hash; the backend is chosen by ANALYZER_STORAGE_BACKEND
+strings_storage = build_store()
+
+# Listing results cached per filter set until the store generation changes
+query_cache = build_query_cache()
+
+# Number of batch items handed to the analysis engine at once
+BATCH_CHUNK_SIZE = 10000
+
+
+def query_page(store, filters, stream=False, **params):
+    """Run a listing query, whose entries come back as JSON bytes.
+
+    Streamed pages skip the query cache and encode each entry as it is sent,
+    so the whole page is never held in memory.
+    """
+    if stream:
+        return store.query(filters, encoded=True, lazy=True, **params)
+    return query_cache.query(store, filters, encoded=True, **params)
+
+
+def build_entry(value, properties):
+    return {
+        'id': properties['sha256_hash'],
+        'value': value,
+        'properties': properties,
+        'created_at': datetime.utcnow().isoformat() + 'Z'
+    }
 
 
 class StringListCreateView(APIView):
     def post(self, request):
-        value = request.data.get('value')
+        with timed('parse'):
+            value = request.data.get('value')
         if not value:
             return Response({'error': 'Missing "value" field'}, status=status.HTTP_400_BAD_REQUEST)
         if not isinstance(value, str):
             return Response({'error': '"value" must be a string'}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
         
-        properties = compute_properties(value)
-        sha256_hash = properties['sha256_hash']
-        if sha256_hash in strings_storage:
+        with timed('analyze'):
+            properties = analyze(value)
+        entry = build_entry(value, properties)
+        # add() is an atomic insert-if-absent, so concurrent duplicates get one 201
+        try:
+            with timed('store'):
+                added = strings_storage.add(entry)
+        except EntryTooLarge as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        if not added:
             return Response({'error': 'String already exists'}, status=status.HTTP_409_CONFLICT)
-        
-        entry = {
-            'id': sha256_hash,
-            'value': value,
-            'properties': properties,
-            'created_at': datetime.utcnow().isoformat() + 'Z'
-        }
-        strings_storage[sha256_hash] = entry
         return Response(entry, status=status.HTTP_201_CREATED)
 
     def get(self, request):
-        # Filtering logic
-        filters = {}
-        if 'is_palindrome' in request.query_params:
-            filters['is_palindrome'] = request.query_params['is_palindrome'].lower() == 'true'
-        if 'min_length' in request.query_params:
-            try:
-                filters['min_length'] = int(request.query_params['min_length'])
-            except ValueError:
-                return Response({'error': 'Invalid min_length'}, status=status.HTTP_400_BAD_REQUEST)
-        if 'max_length' in request.query_params:
-            try:
-                filters['max_length'] = int(request.query_params['max_length'])
-            except ValueError:
-                return Response({'error': 'Invalid max_length'}, status=status.HTTP_400_BAD_REQUEST)
-        if 'word_count' in request.query_params:
-            try:
-                filters['word_count'] = int(request.query_params['word_count'])
-            except ValueError:
-                return Response({'error': 'Invalid word_count'}, status=status.HTTP_400_BAD_REQUEST)
-        if 'contains_character' in request.query_params:
-            char = request.query_params['contains_character']
-            if len(char) != 1:
-                return Response({'error': 'contains_character must be a single character'}, status=status.HTTP_400_BAD_REQUEST)
-            filters['contains_character'] = char
-
-        # Apply filters
-        data = []
-        for entry in strings_storage.values():
-            props = entry['properties']
-            if 'is_palindrome' in filters and props['is_palindrome'] != filters['is_palindrome']:
-                continue
-            if 'min_length' in filters and props['length'] < filters['min_length']:
-                continue
-            if 'max_length' in filters and props['length'] > filters['max_length']:
-                continue
-            if 'word_count' in filters and props['word_count'] != filters['word_count']:
+        etag = listing_etag(strings_storage, request.query_params)
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+
+        try:
+            filters = parse_filters(request.query_params)
+            fields = parse_fields(request.query_params)
+        except FilterError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            after, limit = parse_page_params(request.query_params)
+        except PaginationError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Apply filters through the storage backend's indexes
+        stream = wants_stream(request.query_params)
+        with timed('query'):
+            page = query_page(strings_storage, filters, stream, after=after, limit=limit, fields=fields)
+
+        listing = {'count': page.count, 'filters_applied': filters, 'next_cursor': next_cursor(page)}
+        if stream:
+            response = stream_listing(page.entries, **listing)
+        else:
+            response = PreEncodedResponse(encode_listing(page.entries, **listing))
+        if etag is not None:
+            response['ETag'] = etag
+        return response
+
+class StringBatchCreateView(APIView):
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def post(self, request):
+        items = request.data
+        # A JSON array, or the lazy iterator the NDJSON parser returns; never objects or scalars
+        if not isinstance(items, (list, Iterator)):
+            return Response({'error': 'Expected a JSON array or an NDJSON stream of values'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Validate every item first, analyze valid ones chunk by chunk and
+        # insert them all in a single store update at the end
+        results = []
+        analyzed = []
+        chunk = []
+        for index, item in enumerate(items):
+            value = item.get('value') if isinstance(item, dict) else item
+            if not value:
+                results.append({'index': index, 'status': status.HTTP_400_BAD_REQUEST, 'error': 'Missing "value" field'})
                 continue
-            if 'contains_character' in filters and filters['contains_character'] not in entry['value']:
+            if not isinstance(value, str):
+                results.append({'index': index, 'status': status.HTTP_422_UNPROCESSABLE_ENTITY, 'error': '"value" must be a string'})
                 continue
-            data.append(entry)
+            result = {'index': index}
+            results.append(result)
+            chunk.append((result, value))
+            if len(chunk) >= BATCH_CHUNK_SIZE:
+                analyzed.extend(self._analyze(chunk))
+                chunk = []
+        analyzed.extend(self._analyze(chunk))
 
+        with timed('store'):
+            added = strings_storage.add_many(entry for _, entry in analyzed)
+        for (result, entry), was_added in zip(analyzed, added):
+            result['id'] = entry['id']
+            if was_added:
+                result['status'] = status.HTTP_201_CREATED
+            elif was_added is None:
+                result['status'] = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                result['error'] = "String is larger than the store's byte budget"
+            else:
+                result['status'] = status.HTTP_409_CONFLICT
+                result['error'] = 'String already exists'
+
+        created = added.count(True)
+        duplicates = added.count(False)
         return Response({
-            'data': data,
-            'count': len(data),
-            'filters_applied': filters
+            'results': results,
+            'created': created,
+            'duplicates': duplicates,
+            'invalid': len(results) - created - duplicates,
         })
 
+    @timed('analyze')
+    def _analyze(self, chunk):
+        properties = analyze_many(value for _, value in chunk)
+        return [(result, build_entry(value, props)) for (result, value), props in zip(chunk, properties)]
+
+
+class StringExportView(APIView):
+    def get(self, request):
+        # Streamed from a generator, so the corpus is never serialized in one piece
+        return StreamingHttpResponse(export_chunks(strings_storage), content_type=NDJSON_CONTENT_TYPE)
+
+
+class StringImportView(APIView):
+    def post(self, request):
+        # Read the body line by line instead of through a parser, so it is never held whole;
+        # entries keep their exported properties, only the hashes are checked
+        lines = request.stream if request.stream is not None else ()
+        with timed('store'):
+            summary = import_lines(strings_storage, lines)
+        return Response(summary)
+
+
+class StringChangesView(APIView):
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, EventStreamRenderer]
+
+    def get(self, request):
+        feed = strings_storage.changes
+        if feed is None:
+            return Response({'error': 'The change feed is not available with this storage backend'}, status=status.HTTP_501_NOT_IMPLEMENTED)
+        try:
+            since, wait = parse_changes_params(request.query_params, request.headers.get('Last-Event-ID'))
+        except ChangeFeedError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if since is None:
+            since = feed.now()
+
+        if request.accepted_renderer.format == EventStreamRenderer.format:
+            response = StreamingHttpResponse(event_stream(feed, since), content_type=EVENT_STREAM_CONTENT_TYPE)
+            response['Cache-Control'] = 'no-cache'
+            return response
+        # Long-poll: hold the request until a change arrives or the wait runs out
+        changes, last_seq = feed.wait(since, wait) if wait else feed.since(since)
+        return Response(changes_response_data(feed, changes, last_seq))
+
+
 class StringDetailView(APIView):
     def get(self, request, string_value):
-        # Find by value, but since id is hash, we need to search
-        for entry in strings_storage.values():
-            if entry['value'] == string_value:
-                return Response(entry)
-        raise Http404
+        # Ids are the SHA-256 of the value, so hash the path value and look it up directly
+        entry_id = compute_hash(string_value)
+        etag = entry_etag(entry_id)
+        if entry_id in strings_storage:
+            response = not_modified(request, etag)
+            if response is not None:
+                return response
+        with timed('store'):
+            entry = strings_storage.get(entry_id)
+        if entry is None:
+            raise Http404
+        return Response(entry, headers={'ETag': etag})
 
     def delete(self, request, string_value):
-        for key, entry in strings_storage.items():
-            if entry['value'] == string_value:
-                del strings_storage[key]
-                return Response(status=status.HTTP_204_NO_CONTENT)
-        raise Http404
+        entry_id = compute_hash(string_value)
+        with timed('store'):
+            entry = strings_storage.pop(entry_id, None)
+        if entry is None:
+            raise Http404
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 class StringNaturalLanguageFilterView(APIView):
     def get(self, request):
+        etag = listing_etag(strings_storage, request.query_params)
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+
         query = request.query_params.get('query', '')
         if not query:
             return Response({'error': 'Missing query parameter'}, status=status.HTTP_400_BAD_REQUEST)
 
-        parsed_filters = {}
-        original = query.lower()
-
-        # Simple parsing for supported queries
-        if 'single word' in original or 'word_count=1' in original:
-            parsed_filters['word_count'] = 1
-        if 'palindromic' in original or 'is_palindrome=true' in original:
-            parsed_filters['is_palindrome'] = True
-        if 'longer than' in original:
-            match = re.search(r'longer than (\d+) characters?', original)
-            if match:
-                parsed_filters['min_length'] = int(match.group(1)) + 1
-        if 'containing the letter' in original:
-            match = re.search(r'containing the letter (\w)', original)
-            if match:
-                parsed_filters['contains_character'] = match.group(1)
-        if 'containing' in original and 'first vowel' in original:
-            parsed_filters['contains_character'] = 'a'  # heuristic
-
-        # Check for conflicts (none expected in simple parsing)
-
-        # Apply filters
-        data = []
-        for entry in strings_storage.values():
-            props = entry['properties']
-            match = True
-            if 'word_count' in parsed_filters and props['word_count'] != parsed_filters['word_count']:
-                match = False
-            if 'is_palindrome' in parsed_filters and props['is_palindrome'] != parsed_filters['is_palindrome']:
-                match = False
-            if 'min_length' in parsed_filters and props['length'] < parsed_filters['min_length']:
-                match = False
-            if 'contains_character' in parsed_filters and parsed_filters['contains_character'] not in entry['value']:
-                match = False
-            if match:
-                data.append(entry)
+        try:
+            with timed('parse_query'):
+                parsed_filters = parse_query(query)
+        except QueryConflictError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        except QueryError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response({
-            'data': data,
-            'count': len(data),
-            'interpreted_query': {
-                'original': query,
-                'parsed_filters': parsed_filters
-            }
-        })
+        try:
+            fields = parse_fields(request.query_params)
+        except FilterError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            after, limit = parse_page_params(request.query_params)
+        except PaginationError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Same filter engine as the structured listing
+        stream = wants_stream(request.query_params)
+        with timed('query'):
+            page = query_page(strings_storage, parsed_filters, stream, after=after, limit=limit, fields=fields)
+
+        interpreted_query = {
+            'original': query,
+            'parsed_filters': parsed_filters
+        }
+        listing = {'count': page.count, 'interpreted_query': interpreted_query, 'next_cursor': next_cursor(page)}
+        if stream:
+            response = stream_listing(page.entries, **listing)
+        else:
+            response = PreEncodedResponse(encode_listing(page.entries, **listing))
+        if etag is not None:
+            response['ETag'] = etag
+        return response
+
+
+class StringStatsView(APIView):
+    def get(self, request):
+        etag = listing_etag(strings_storage, request.query_params)
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+
+        try:
+            filters = parse_filters(request.query_params)
+        except FilterError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        with timed('query'):
+            data = strings_storage.stats(filters)
+        data['filters_applied'] = filters
+        return Response(data, headers={'ETag': etag} if etag is not None else None)
+
+
+class QueryCacheStatsView(APIView):
+    def get(self, request):
+        return Response(query_cache.stats())
+
+
+class MetricsView(APIView):
+    def get(self, request):
+        cache = query_cache.stats()
+        gauges = [
+            ('analyzer_strings_stored', 'Strings currently stored.', len(strings_storage)),
+            ('analyzer_query_cache_hits', 'Listing queries answered from the query cache.', cache['hits']),
+            ('analyzer_query_cache_misses', 'Listing queries that ran against the store.', cache['misses']),
+            ('analyzer_query_cache_size', 'Results currently held in the query cache.', cache['size']),
+        ]
+        capacity = getattr(strings_storage, 'capacity', None)
+        if capacity is not None:
+            gauges += [
+                ('analyzer_store_evictions_capacity', 'Entries evicted to stay within the store limits.', capacity.evictions['capacity']),
+                ('analyzer_store_evictions_expired', 'Entries dropped after their TTL.', capacity.evictions['expired']),
+            ]
+            if capacity.max_bytes:
+                gauges.append(('analyzer_store_bytes', 'Approximate bytes held by the in-memory store.', capacity.bytes))
+        return HttpResponse(registry.render(gauges), content_type='text/plain; version=0.0.4; charset=utf-8')